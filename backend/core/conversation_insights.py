@@ -6,6 +6,8 @@ Extracts topics, entities, and generates analytics dashboard data
 from typing import List, Dict, Optional, Tuple, Set
 from dataclasses import dataclass
 from collections import Counter
+import hashlib
+import heapq
 import re
 from datetime import datetime, timedelta
 
@@ -15,6 +17,13 @@ from backend.database.operations import get_db
 from sqlalchemy.orm import Session
 
 
+# Candidate topic tokens: capitalized words or lowercase/underscore/hyphen runs
+WORD_PATTERN = re.compile(r'\b[A-Z][a-zA-Z]+\b|\b[a-z_-]+\b')
+
+# Sentence boundaries used when sampling topic/entity contexts
+SENTENCE_SPLIT_PATTERN = re.compile(r'[.!?]+')
+
+
 @dataclass
 class TopicScore:
     """A topic with relevance score"""
@@ -101,10 +110,14 @@ class ConversationInsightsAnalyzer:
         if not messages:
             return self._empty_insights()
         
+        # Join and split the transcript once for the topic and entity extractors
+        all_text = ' '.join(m.content for m in messages if m.role in ['user', 'assistant'])
+        sentences = self._split_sentences(all_text)
+        
         # Extract components
-        topics = self._extract_topics(messages)
+        topics = self._extract_topics(all_text, sentences)
         topic_clusters = self._cluster_topics(topics)
-        entities = self._extract_entities(messages)
+        entities = self._extract_entities(all_text, sentences)
         conv_type = self._determine_conversation_type(messages)
         complexity = self._assess_complexity(messages)
         relationships = self._extract_relationships(messages, topics, entities)
@@ -122,16 +135,16 @@ class ConversationInsightsAnalyzer:
             duration_minutes=duration
         )
     
-    def _extract_topics(self, messages: List[Message]) -> List[TopicScore]:
-        """Extract main topics from conversation"""
-        # Combine all text
-        all_text = ' '.join(m.content for m in messages if m.role in ['user', 'assistant'])
-        all_text_lower = all_text.lower()
-        
+    def _extract_topics(
+        self,
+        all_text: str,
+        sentences: List[Tuple[str, str]]
+    ) -> List[TopicScore]:
+        """Extract main topics from the combined conversation text"""
         topic_scores = {}
         
         # Extract noun phrases (simplified - look for capitalized words and technical terms)
-        words = re.findall(r'\b[A-Z][a-zA-Z]+\b|\b[a-z_-]+\b', all_text)
+        words = WORD_PATTERN.findall(all_text)
         
         # Score words by frequency and context
         word_freq = Counter(w.lower() for w in words if len(w) > 3)
@@ -153,7 +166,7 @@ class ConversationInsightsAnalyzer:
                     break
             
             # Extract contexts
-            contexts = self._find_contexts(all_text, word, max_contexts=3)
+            contexts = self._find_contexts(sentences, word, max_contexts=3)
             
             topic_scores[word] = TopicScore(
                 topic=word,
@@ -162,22 +175,31 @@ class ConversationInsightsAnalyzer:
                 context=contexts
             )
         
-        # Sort by score
-        sorted_topics = sorted(topic_scores.values(), key=lambda t: t.score, reverse=True)
-        
-        return sorted_topics[:10]  # Top 10 topics
+        # Top 10 topics by score
+        return heapq.nlargest(10, topic_scores.values(), key=lambda t: t.score)
+    
+    def _split_sentences(self, text: str) -> List[Tuple[str, str]]:
+        """Split text into (sentence, lowercased sentence) pairs"""
+        return [(sent, sent.lower()) for sent in SENTENCE_SPLIT_PATTERN.split(text)]
     
-    def _find_contexts(self, text: str, word: str, max_contexts: int = 3) -> List[str]:
+    def _find_contexts(
+        self,
+        sentences: List[Tuple[str, str]],
+        word: str,
+        max_contexts: int = 3
+    ) -> List[str]:
         """Find sample contexts where word appears"""
         contexts = []
-        sentences = re.split(r'[.!?]+', text)
+        word_lower = word.lower()
         
-        for sent in sentences:
-            if word.lower() in sent.lower() and len(contexts) < max_contexts:
+        for sent, sent_lower in sentences:
+            if len(contexts) >= max_contexts:
+                break
+            if word_lower in sent_lower:
                 # Trim to reasonable length
                 if len(sent) > 100:
                     # Find word position and extract around it
-                    word_pos = sent.lower().find(word.lower())
+                    word_pos = sent_lower.find(word_lower)
                     start = max(0, word_pos - 40)
                     end = min(len(sent), word_pos + 60)
                     sent = '...' + sent[start:end] + '...'
@@ -211,9 +233,12 @@ class ConversationInsightsAnalyzer:
         
         return clusters
     
-    def _extract_entities(self, messages: List[Message]) -> Dict[str, List[Entity]]:
-        """Extract entities (technologies, products, concepts)"""
-        all_text = ' '.join(m.content for m in messages if m.role in ['user', 'assistant'])
+    def _extract_entities(
+        self,
+        all_text: str,
+        sentences: List[Tuple[str, str]]
+    ) -> Dict[str, List[Entity]]:
+        """Extract entities (technologies, products, concepts) from the combined text"""
         all_text_lower = all_text.lower()
         
         entities_by_type = {}
@@ -226,7 +251,7 @@ class ConversationInsightsAnalyzer:
                 
                 if freq > 0:
                     # Find contexts
-                    contexts = self._find_contexts(all_text, entity_text, max_contexts=2)
+                    contexts = self._find_contexts(sentences, entity_text, max_contexts=2)
                     
                     entity = Entity(
                         text=entity_text,
@@ -277,10 +302,11 @@ class ConversationInsightsAnalyzer:
         # Factors for complexity
         avg_msg_length = sum(len(m.content) for m in messages) / len(messages)
         
-        # Count technical terms
+        # Count technical terms (lowercase the text once, not per term)
+        all_text_lower = all_text.lower()
         technical_term_count = 0
         for terms in self.TECHNICAL_TERMS.values():
-            technical_term_count += sum(1 for term in terms if term in all_text.lower())
+            technical_term_count += sum(1 for term in terms if term in all_text_lower)
         
         # Count code blocks
         code_blocks = all_text.count('```')
@@ -302,15 +328,24 @@ class ConversationInsightsAnalyzer:
         """Extract relationships between topics and entities"""
         relationships = []
         
+        # Lowercase each message once and record which messages mention each
+        # candidate term, so pair counts become set intersections
+        msg_lower = [m.content.lower() for m in messages]
+        candidates = {t.topic.lower() for t in topics[:6]}
+        for entity_list in entities.values():
+            candidates.update(e.text.lower() for e in entity_list[:3])
+        term_msgs: Dict[str, Set[int]] = {
+            term: {i for i, text in enumerate(msg_lower) if term in text}
+            for term in candidates
+        }
+        
         # Find topics that appear together in messages
         for i, topic_a in enumerate(topics[:5]):  # Top 5 topics
             for topic_b in topics[i+1:6]:
                 # Check if they appear in same messages
-                co_occurrence = 0
-                for msg in messages:
-                    if (topic_a.topic.lower() in msg.content.lower() and
-                        topic_b.topic.lower() in msg.content.lower()):
-                        co_occurrence += 1
+                co_occurrence = len(
+                    term_msgs[topic_a.topic.lower()] & term_msgs[topic_b.topic.lower()]
+                )
                 
                 if co_occurrence > 0:
                     relationships.append({
@@ -322,14 +357,11 @@ class ConversationInsightsAnalyzer:
         
         # Link topics to entities
         for topic in topics[:5]:
+            topic_msgs = term_msgs[topic.topic.lower()]
             for entity_type, entity_list in entities.items():
                 for entity in entity_list[:3]:  # Top 3 entities per type
                     # Check if topic and entity appear together
-                    co_occurrence = 0
-                    for msg in messages:
-                        if (topic.topic.lower() in msg.content.lower() and
-                            entity.text.lower() in msg.content.lower()):
-                            co_occurrence += 1
+                    co_occurrence = len(topic_msgs & term_msgs[entity.text.lower()])
                     
                     if co_occurrence > 0:
                         relationships.append({
@@ -409,7 +441,8 @@ class ConversationInsightsAnalyzer:
         conversation_id: int,
         user_id: int,
         insights_data: InsightsData,
-        db: Optional[Session] = None
+        db: Optional[Session] = None,
+        content_hash: Optional[str] = None
     ) -> ConversationInsight:
         """
         Save insights to database
@@ -419,6 +452,7 @@ class ConversationInsightsAnalyzer:
             user_id: User ID
             insights_data: Insights data to save
             db: Database session
+            content_hash: Digest of the analyzed messages (see compute_content_hash)
         
         Returns:
             ConversationInsight model
@@ -461,6 +495,7 @@ class ConversationInsightsAnalyzer:
                 existing.assistant_messages = stats.get('assistant_messages', 0)
                 existing.avg_message_length = stats.get('avg_message_length', 0.0)
                 existing.conversation_duration_minutes = insights_data.duration_minutes
+                existing.content_hash = content_hash
                 existing.updated_at = datetime.utcnow()
                 
                 insight = existing
@@ -479,7 +514,8 @@ class ConversationInsightsAnalyzer:
                     user_messages=stats.get('user_messages', 0),
                     assistant_messages=stats.get('assistant_messages', 0),
                     avg_message_length=stats.get('avg_message_length', 0.0),
-                    conversation_duration_minutes=insights_data.duration_minutes
+                    conversation_duration_minutes=insights_data.duration_minutes,
+                    content_hash=content_hash
                 )
                 db.add(insight)
             
@@ -493,6 +529,24 @@ class ConversationInsightsAnalyzer:
 
 
 # Convenience functions
+def compute_content_hash(messages: List[Message]) -> str:
+    """
+    Cheap digest of message ids, roles and contents
+    
+    Args:
+        messages: List of messages
+    
+    Returns:
+        Hex digest that changes whenever the conversation changes
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for m in messages:
+        digest.update(f"{m.id}\x00{m.role}\x00".encode('utf-8'))
+        digest.update(m.content.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
 def analyze_conversation(
     conversation_id: int,
     user_id: int
@@ -509,15 +563,30 @@ def analyze_conversation(
     """
     from backend.database.operations import MessageDB
     
-    messages = MessageDB.get_messages(conversation_id)
-    
-    if not messages:
-        return None
-    
-    analyzer = ConversationInsightsAnalyzer()
-    insights_data = analyzer.analyze_conversation(messages, conversation_id, user_id)
-    
-    return analyzer.save_insights(conversation_id, user_id, insights_data)
+    # One session for both the message load and the insight upsert
+    db = get_db()
+    try:
+        messages = MessageDB.get_messages(conversation_id, db=db)
+        
+        if not messages:
+            return None
+        
+        # Skip the analysis pipeline when nothing changed since the last run
+        content_hash = compute_content_hash(messages)
+        existing = db.query(ConversationInsight).filter(
+            ConversationInsight.conversation_id == conversation_id
+        ).first()
+        if existing and existing.content_hash == content_hash:
+            return existing
+        
+        analyzer = ConversationInsightsAnalyzer()
+        insights_data = analyzer.analyze_conversation(messages, conversation_id, user_id)
+        
+        return analyzer.save_insights(
+            conversation_id, user_id, insights_data, db=db, content_hash=content_hash
+        )
+    finally:
+        db.close()
 
 
 def get_conversation_insights(conversation_id: int) -> Optional[ConversationInsight]:
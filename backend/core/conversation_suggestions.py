@@ -3,25 +3,249 @@ Conversation Suggestions Engine
 Generates continuation suggestions, follow-up questions, and smart prompts
 """
 
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, NamedTuple, Optional, Sequence, Tuple
 from dataclasses import dataclass
+from collections import OrderedDict
+from itertools import chain
+from operator import attrgetter
+import heapq
 import re
+import threading
 from datetime import datetime, timedelta
 
 from backend.database.models import Message, Conversation
 from backend.database.conversation_insights_models import ConversationSuggestion
 from backend.database.operations import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, or_, update
+from sqlalchemy.orm import Session, load_only
 
 
-@dataclass
-class Suggestion:
-    """A single suggestion"""
+# Phrases that signal the assistant considers the exchange wrapped up
+COMPLETION_PATTERN = re.compile(
+    r"\b(?:hope this helps|you're welcome|glad to help|happy to assist"
+    r"|let me know if|feel free to|don't hesitate"
+    r"|is there anything else|anything else I can help"
+    r"|that's it|that should do it|that covers it)\b",
+    re.IGNORECASE
+)
+
+# Heuristic caps on how much text context analysis lowercases and scans
+SCAN_MAX_MESSAGE_CHARS = 8192
+SCAN_MAX_TOTAL_CHARS = 65536
+
+# How much of the last assistant reply to search for completion phrases
+COMPLETION_SCAN_CHARS = 400
+
+# Whitespace-delimited tokens containing an underscore (snake_case identifiers).
+# Tokens are lowercased first, so these are the only ones the title/upper-case
+# topic heuristics can accept; the lookbehind anchors matches at token starts.
+TOPIC_TOKEN_PATTERN = re.compile(r'(?<!\S)[^\s_]*_\S*')
+
+# Numbered list or bullet markers in a response
+LIST_MARKER_PATTERN = re.compile(r'[\d\-\*\u2022]')
+
+# Code fences or programming terms that call for practical guidance
+CODE_TERMS_PATTERN = re.compile(r'```|api|function|class|method', re.IGNORECASE)
+
+# Design-level terms that warrant a trade-offs deep dive
+TECHNICAL_TERMS_PATTERN = re.compile(r'algorithm|architecture|design|pattern|system', re.IGNORECASE)
+
+
+# Numeric rank of each priority level, used for ordering suggestions
+PRIORITY_RANK = {'high': 3, 'medium': 2, 'low': 1}
+
+
+class Suggestion(NamedTuple):
+    """A single suggestion (immutable, so fixed suggestions can be shared)"""
     text: str
     category: str  # clarification, expansion, related, deep-dive, next-step
     relevance_score: float
     priority: str  # low, medium, high
     reason: str
+    sort_key: Tuple[int, float]  # (priority rank, relevance), set by make_suggestion
+
+
+def make_suggestion(
+    text: str,
+    category: str,
+    relevance_score: float,
+    priority: str,
+    reason: str
+) -> Suggestion:
+    """Build a Suggestion with its sort key computed once up front"""
+    return Suggestion(
+        text=text,
+        category=category,
+        relevance_score=relevance_score,
+        priority=priority,
+        reason=reason,
+        sort_key=(PRIORITY_RANK[priority], relevance_score)
+    )
+
+
+# Fixed suggestions, built once at import instead of on every request
+SIMPLIFY_SUGGESTIONS = (
+    make_suggestion(
+        text="Can you elaborate on that in simpler terms?",
+        category="clarification",
+        relevance_score=0.8,
+        priority="high",
+        reason="Last response was detailed, user might need clarification"
+    ),
+    make_suggestion(
+        text="Can you give me a specific example of that?",
+        category="clarification",
+        relevance_score=0.75,
+        priority="medium",
+        reason="Examples help understand complex explanations"
+    )
+)
+
+PRACTICAL_SUGGESTION = make_suggestion(
+    text="How would I implement this in practice?",
+    category="clarification",
+    relevance_score=0.85,
+    priority="high",
+    reason="Technical content suggests need for practical guidance"
+)
+
+# Per-topic templates; text and reason are filled in with _replace()
+TELL_ME_MORE_TEMPLATE = make_suggestion(
+    text="Tell me more about {topic}",
+    category="expansion",
+    relevance_score=0.7,
+    priority="medium",
+    reason="User might want to explore '{topic}' further"
+)
+
+BEST_PRACTICES_TEMPLATE = make_suggestion(
+    text="What are the best practices for {topic}?",
+    category="expansion",
+    relevance_score=0.75,
+    priority="medium",
+    reason="Best practices are commonly sought for '{topic}'"
+)
+
+FIRST_POINT_SUGGESTION = make_suggestion(
+    text="Can you explain the first point in more detail?",
+    category="deep-dive",
+    relevance_score=0.8,
+    priority="medium",
+    reason="Response contained multiple points worth exploring"
+)
+
+TRADE_OFFS_SUGGESTION = make_suggestion(
+    text="What are the trade-offs and considerations here?",
+    category="deep-dive",
+    relevance_score=0.85,
+    priority="high",
+    reason="Technical discussion suggests need for deeper analysis"
+)
+
+RELATED_SUGGESTIONS = (
+    make_suggestion(
+        text="What are some common pitfalls to avoid?",
+        category="related",
+        relevance_score=0.7,
+        priority="medium",
+        reason="Understanding pitfalls helps avoid mistakes"
+    ),
+    make_suggestion(
+        text="Are there any alternatives or better approaches?",
+        category="related",
+        relevance_score=0.75,
+        priority="medium",
+        reason="Exploring alternatives provides broader perspective"
+    )
+)
+
+NEXT_STEP_SUGGESTIONS = (
+    make_suggestion(
+        text="What should I do first to get started?",
+        category="next-step",
+        relevance_score=0.9,
+        priority="high",
+        reason="Actionable conversation needs clear next steps"
+    ),
+    make_suggestion(
+        text="What tools or resources do I need for this?",
+        category="next-step",
+        relevance_score=0.85,
+        priority="high",
+        reason="Implementation requires proper tools and resources"
+    ),
+    make_suggestion(
+        text="How long would this typically take to implement?",
+        category="next-step",
+        relevance_score=0.75,
+        priority="medium",
+        reason="Time estimation helps with planning"
+    )
+)
+
+# The second suggestion only applies when topics were found
+NEW_DIRECTION_SUGGESTIONS = (
+    make_suggestion(
+        text="What else can I learn about this topic?",
+        category="new-direction",
+        relevance_score=0.6,
+        priority="low",
+        reason="Conversation appears complete, suggesting new exploration"
+    ),
+    make_suggestion(
+        text="How does this relate to real-world applications?",
+        category="new-direction",
+        relevance_score=0.65,
+        priority="low",
+        reason="Connecting theory to practice is valuable"
+    )
+)
+
+DEFAULT_SUGGESTIONS = (
+    make_suggestion(
+        text="What can you help me with?",
+        category="general",
+        relevance_score=0.5,
+        priority="medium",
+        reason="Starting a new conversation"
+    ),
+    make_suggestion(
+        text="I need help with...",
+        category="general",
+        relevance_score=0.5,
+        priority="medium",
+        reason="General help request"
+    ),
+    make_suggestion(
+        text="Can you explain...",
+        category="general",
+        relevance_score=0.5,
+        priority="medium",
+        reason="Seeking explanation"
+    )
+)
+
+
+# Rule-based suggestions are deterministic for a given message set, so they
+# are cached by (conversation_id, message_count, last_message_id, num_suggestions)
+SUGGESTION_CACHE_SIZE = 1024
+_suggestion_cache: "OrderedDict[Tuple, List[Suggestion]]" = OrderedDict()
+_suggestion_cache_lock = threading.Lock()
+
+# Derived context scalars (type, completion, topics, ...) keyed the same way,
+# minus num_suggestions; these also serve the uncached AI path
+CONTEXT_CACHE_SIZE = 2048
+_context_cache: "OrderedDict[Tuple, Tuple[str, bool, Tuple[str, ...], bool]]" = OrderedDict()
+_context_cache_lock = threading.Lock()
+
+
+@dataclass
+class ConversationScan:
+    """Everything context analysis needs, gathered in one pass over messages"""
+    texts: List[str]  # Lowercased user/assistant message contents
+    topic_words: List[str]  # Lowercased topic candidate tokens from user messages
+    last_user_msg: Optional[Message]
+    last_assistant_msg: Optional[Message]
 
 
 class ConversationSuggestionEngine:
@@ -30,6 +254,28 @@ class ConversationSuggestionEngine:
     Analyzes context and intent to suggest relevant follow-ups
     """
     
+    # Keywords for different conversation types
+    CONVERSATION_TYPE_PATTERNS = {
+        'problem-solving': frozenset({
+            'problem', 'issue', 'error', 'fix', 'solve', 'debug', 'troubleshoot'
+        }),
+        'implementation': frozenset({
+            'implement', 'build', 'create', 'develop', 'code', 'setup', 'configure'
+        }),
+        'exploratory': frozenset({
+            'how', 'why', 'what', 'explain', 'understand', 'learn', 'tell me about'
+        }),
+        'informational': frozenset({
+            'what is', 'define', 'definition', 'information', 'details'
+        }),
+        'creative': frozenset({
+            'idea', 'brainstorm', 'suggest', 'design', 'plan', 'strategy'
+        })
+    }
+    
+    # Every distinct keyword, searched once per message
+    CONVERSATION_KEYWORDS = tuple(sorted(frozenset().union(*CONVERSATION_TYPE_PATTERNS.values())))
+    
     def __init__(self, llm_provider=None, model: str = None):
         """
         Initialize suggestion engine
@@ -65,22 +311,45 @@ class ConversationSuggestionEngine:
         if not messages:
             return self._default_suggestions()
         
+        use_ai = bool(use_ai and self.llm_provider)
+        cache_key = (conversation_id, len(messages), messages[-1].id, num_suggestions)
+        if not use_ai:
+            with _suggestion_cache_lock:
+                cached = _suggestion_cache.get(cache_key)
+                if cached is not None:
+                    _suggestion_cache.move_to_end(cache_key)
+            if cached is not None:
+                return list(cached)
+        
         # Analyze conversation context
-        context = self._analyze_context(messages)
+        context = self._analyze_context(messages, conversation_id)
         
-        if use_ai and self.llm_provider:
+        if use_ai:
             suggestions = self._ai_generate_suggestions(messages, context, num_suggestions)
         else:
             suggestions = self._rule_based_suggestions(messages, context, num_suggestions)
         
-        return suggestions[:num_suggestions]
+        if not use_ai:
+            with _suggestion_cache_lock:
+                _suggestion_cache[cache_key] = suggestions
+                if len(_suggestion_cache) > SUGGESTION_CACHE_SIZE:
+                    _suggestion_cache.popitem(last=False)
+            suggestions = list(suggestions)
+        
+        return suggestions
     
-    def _analyze_context(self, messages: List[Message]) -> Dict:
+    def _analyze_context(
+        self,
+        messages: List[Message],
+        conversation_id: Optional[int] = None
+    ) -> Dict:
         """
         Analyze conversation context
         
         Args:
             messages: List of messages
+            conversation_id: Conversation ID; when given, the analysis is
+                cached for this exact message set
         
         Returns:
             Context dictionary with analysis
@@ -88,26 +357,49 @@ class ConversationSuggestionEngine:
         # Get last N messages for context
         recent_messages = messages[-5:] if len(messages) > 5 else messages
         
-        # Determine conversation type
-        conv_type = self._determine_conversation_type(messages)
-        
-        # Check if conversation seems complete
-        is_complete = self._is_conversation_complete(messages)
-        
-        # Extract main topics
-        topics = self._extract_topics(messages)
-        
-        # Get last user question
-        last_user_msg = next((m for m in reversed(messages) if m.role == 'user'), None)
-        last_assistant_msg = next((m for m in reversed(messages) if m.role == 'assistant'), None)
-        
-        # Check for incomplete topics
-        has_unanswered_questions = self._has_unanswered_questions(messages)
+        cache_key = None
+        cached = None
+        if conversation_id is not None and messages:
+            cache_key = (conversation_id, len(messages), messages[-1].id)
+            with _context_cache_lock:
+                cached = _context_cache.get(cache_key)
+                if cached is not None:
+                    _context_cache.move_to_end(cache_key)
+        
+        if cached is not None:
+            conv_type, is_complete, topics, has_unanswered_questions = cached
+            # Message objects aren't cached; finding the latest ones is cheap
+            last_user_msg, last_assistant_msg = self._latest_messages(messages)
+        else:
+            # Lowercase and tokenize every message once
+            scan = self._scan(messages)
+            last_user_msg = scan.last_user_msg
+            last_assistant_msg = scan.last_assistant_msg
+            
+            # Determine conversation type
+            conv_type = self._determine_conversation_type(scan.texts)
+            
+            # Check if conversation seems complete
+            is_complete = self._is_conversation_complete(last_assistant_msg, len(messages))
+            
+            # Extract main topics
+            topics = self._extract_topics(scan.topic_words)
+            
+            # Check for incomplete topics
+            has_unanswered_questions = self._has_unanswered_questions(messages)
+            
+            if cache_key is not None:
+                with _context_cache_lock:
+                    _context_cache[cache_key] = (
+                        conv_type, is_complete, tuple(topics), has_unanswered_questions
+                    )
+                    if len(_context_cache) > CONTEXT_CACHE_SIZE:
+                        _context_cache.popitem(last=False)
         
         return {
             'conv_type': conv_type,
             'is_complete': is_complete,
-            'topics': topics,
+            'topics': list(topics),
             'last_user_msg': last_user_msg,
             'last_assistant_msg': last_assistant_msg,
             'recent_messages': recent_messages,
@@ -115,6 +407,64 @@ class ConversationSuggestionEngine:
             'message_count': len(messages)
         }
     
+    def _latest_messages(
+        self,
+        messages: List[Message]
+    ) -> Tuple[Optional[Message], Optional[Message]]:
+        """Find the latest user and assistant messages, walking back from the end"""
+        last_user_msg = None
+        last_assistant_msg = None
+        for msg in reversed(messages):
+            if msg.role == 'user' and last_user_msg is None:
+                last_user_msg = msg
+            elif msg.role == 'assistant' and last_assistant_msg is None:
+                last_assistant_msg = msg
+            if last_user_msg is not None and last_assistant_msg is not None:
+                break
+        return last_user_msg, last_assistant_msg
+    
+    def _scan(self, messages: List[Message]) -> ConversationScan:
+        """
+        Walk messages once, collecting lowercased text, topic tokens and
+        the latest user/assistant messages
+        
+        Args:
+            messages: List of messages
+        
+        Returns:
+            ConversationScan with the fused results
+        """
+        lowered = []
+        topic_words = []
+        last_user_msg = None
+        last_assistant_msg = None
+        scanned_chars = 0
+        
+        for msg in messages:
+            if msg.role == 'user':
+                last_user_msg = msg
+            elif msg.role == 'assistant':
+                last_assistant_msg = msg
+            else:
+                continue
+            
+            # Type and topic signals plateau long before a pasted log ends,
+            # so text analysis is capped; latest-message tracking is not
+            if scanned_chars >= SCAN_MAX_TOTAL_CHARS:
+                continue
+            content_lower = msg.content[:SCAN_MAX_MESSAGE_CHARS].lower()
+            scanned_chars += len(content_lower)
+            lowered.append(content_lower)
+            if msg.role == 'user':
+                topic_words.extend(TOPIC_TOKEN_PATTERN.findall(content_lower))
+        
+        return ConversationScan(
+            texts=lowered,
+            topic_words=topic_words,
+            last_user_msg=last_user_msg,
+            last_assistant_msg=last_assistant_msg
+        )
+    
     def _rule_based_suggestions(
         self,
         messages: List[Message],
@@ -132,113 +482,92 @@ class ConversationSuggestionEngine:
         Returns:
             List of suggestions
         """
-        suggestions = []
+        last_assistant_msg = context['last_assistant_msg']
+        topics = context['topics']
         
         # Strategy 1: Clarification questions if last answer was complex
-        if context['last_assistant_msg']:
-            clarification = self._generate_clarification_suggestions(
-                context['last_assistant_msg']
-            )
-            suggestions.extend(clarification)
+        clarification = (
+            self._generate_clarification_suggestions(last_assistant_msg)
+            if last_assistant_msg else ()
+        )
         
         # Strategy 2: Expansion suggestions based on topics
-        if context['topics']:
-            expansion = self._generate_expansion_suggestions(context['topics'])
-            suggestions.extend(expansion)
+        expansion = self._generate_expansion_suggestions(topics) if topics else ()
         
         # Strategy 3: Deep-dive into specific aspects
-        deep_dive = self._generate_deep_dive_suggestions(messages)
-        suggestions.extend(deep_dive)
+        deep_dive = self._generate_deep_dive_suggestions(last_assistant_msg)
         
         # Strategy 4: Related topics
-        related = self._generate_related_suggestions(context['topics'])
-        suggestions.extend(related)
+        related = self._generate_related_suggestions(topics)
         
         # Strategy 5: Next steps if actionable conversation
-        if context['conv_type'] in ['problem-solving', 'implementation']:
-            next_steps = self._generate_next_step_suggestions(messages)
-            suggestions.extend(next_steps)
+        next_steps = (
+            self._generate_next_step_suggestions(messages)
+            if context['conv_type'] in ('problem-solving', 'implementation') else ()
+        )
         
         # Strategy 6: If conversation seems complete, suggest new directions
-        if context['is_complete']:
-            new_directions = self._generate_new_direction_suggestions(context['topics'])
-            suggestions.extend(new_directions)
+        new_directions = (
+            self._generate_new_direction_suggestions(topics)
+            if context['is_complete'] else ()
+        )
         
-        # Sort by relevance and priority
-        suggestions.sort(key=lambda s: (
-            {'high': 3, 'medium': 2, 'low': 1}[s.priority],
-            s.relevance_score
-        ), reverse=True)
+        suggestions = chain(
+            clarification, expansion, deep_dive, related, next_steps, new_directions
+        )
         
-        return suggestions
+        # Top suggestions by priority, then relevance
+        return heapq.nlargest(num_suggestions, suggestions, key=attrgetter('sort_key'))
     
-    def _determine_conversation_type(self, messages: List[Message]) -> str:
-        """Determine the type of conversation"""
-        all_text = ' '.join(m.content.lower() for m in messages if m.role in ['user', 'assistant'])
-        
-        # Patterns for different conversation types
-        patterns = {
-            'problem-solving': [
-                'problem', 'issue', 'error', 'fix', 'solve', 'debug', 'troubleshoot'
-            ],
-            'implementation': [
-                'implement', 'build', 'create', 'develop', 'code', 'setup', 'configure'
-            ],
-            'exploratory': [
-                'how', 'why', 'what', 'explain', 'understand', 'learn', 'tell me about'
-            ],
-            'informational': [
-                'what is', 'define', 'definition', 'information', 'details'
-            ],
-            'creative': [
-                'idea', 'brainstorm', 'suggest', 'design', 'plan', 'strategy'
-            ]
-        }
+    def _determine_conversation_type(self, texts: List[str]) -> str:
+        """Determine the type of conversation from lowercased message contents"""
+        # Find which keywords occur, message by message, so no joined copy of
+        # the conversation is built. Plain substring checks beat a combined
+        # regex alternation here: each `in` is a C-level search, while a
+        # one-pass alternation steps through every position in Python's re.
+        remaining = self.CONVERSATION_KEYWORDS
+        found = set()
+        for text in texts:
+            missing = []
+            for kw in remaining:
+                if kw in text:
+                    found.add(kw)
+                else:
+                    missing.append(kw)
+            remaining = missing
+            if not remaining:
+                break
         
         # Count matches for each type
         scores = {}
-        for conv_type, keywords in patterns.items():
-            score = sum(1 for kw in keywords if kw in all_text)
-            scores[conv_type] = score
+        for conv_type, keywords in self.CONVERSATION_TYPE_PATTERNS.items():
+            scores[conv_type] = len(keywords & found)
         
         # Return type with highest score, default to exploratory
         if scores:
             return max(scores.items(), key=lambda x: x[1])[0]
         return 'exploratory'
     
-    def _is_conversation_complete(self, messages: List[Message]) -> bool:
+    def _is_conversation_complete(
+        self,
+        last_assistant: Optional[Message],
+        message_count: int
+    ) -> bool:
         """Check if conversation seems complete"""
-        if len(messages) < 2:
+        if message_count < 2:
             return False
         
-        last_assistant = next((m for m in reversed(messages) if m.role == 'assistant'), None)
         if not last_assistant:
             return False
         
-        # Check for completion indicators
-        completion_indicators = [
-            r'\b(?:hope this helps|you\'re welcome|glad to help|happy to assist)\b',
-            r'\b(?:let me know if|feel free to|don\'t hesitate)\b',
-            r'\b(?:is there anything else|anything else I can help)\b',
-            r'\b(?:that\'s it|that should do it|that covers it)\b'
-        ]
-        
-        content_lower = last_assistant.content.lower()
-        return any(re.search(pattern, content_lower) for pattern in completion_indicators)
+        # Check for completion indicators; sign-off phrases sit at the end of
+        # a reply, so long answers (e.g. code dumps) only need their tail scanned
+        tail = last_assistant.content[-COMPLETION_SCAN_CHARS:]
+        return bool(COMPLETION_PATTERN.search(tail))
     
-    def _extract_topics(self, messages: List[Message]) -> List[str]:
-        """Extract main topics from conversation"""
-        topics = []
-        
-        # Simple topic extraction from user messages
-        for msg in messages:
-            if msg.role == 'user':
-                # Extract noun phrases (simplified)
-                words = msg.content.lower().split()
-                # Look for capitalized words or technical terms
-                for i, word in enumerate(words):
-                    if len(word) > 4 and (word.istitle() or '_' in word or word.isupper()):
-                        topics.append(word)
+    def _extract_topics(self, topic_words: List[str]) -> List[str]:
+        """Extract main topics from lowercased user-message candidate tokens"""
+        topics = [word for word in topic_words if len(word) > 4]
         
         # Deduplicate and limit
         topics = list(dict.fromkeys(topics))[:5]
@@ -259,31 +588,11 @@ class ConversationSuggestionEngine:
         
         # If message is long or complex, suggest clarifications
         if len(content) > 300:
-            suggestions.append(Suggestion(
-                text="Can you elaborate on that in simpler terms?",
-                category="clarification",
-                relevance_score=0.8,
-                priority="high",
-                reason="Last response was detailed, user might need clarification"
-            ))
-            
-            suggestions.append(Suggestion(
-                text="Can you give me a specific example of that?",
-                category="clarification",
-                relevance_score=0.75,
-                priority="medium",
-                reason="Examples help understand complex explanations"
-            ))
+            suggestions.extend(SIMPLIFY_SUGGESTIONS)
         
         # If message contains code or technical terms
-        if '```' in content or any(term in content.lower() for term in ['api', 'function', 'class', 'method']):
-            suggestions.append(Suggestion(
-                text="How would I implement this in practice?",
-                category="clarification",
-                relevance_score=0.85,
-                priority="high",
-                reason="Technical content suggests need for practical guidance"
-            ))
+        if CODE_TERMS_PATTERN.search(content):
+            suggestions.append(PRACTICAL_SUGGESTION)
         
         return suggestions
     
@@ -292,156 +601,57 @@ class ConversationSuggestionEngine:
         suggestions = []
         
         for topic in topics[:2]:  # Focus on top 2 topics
-            suggestions.append(Suggestion(
+            suggestions.append(TELL_ME_MORE_TEMPLATE._replace(
                 text=f"Tell me more about {topic}",
-                category="expansion",
-                relevance_score=0.7,
-                priority="medium",
                 reason=f"User might want to explore '{topic}' further"
             ))
             
-            suggestions.append(Suggestion(
+            suggestions.append(BEST_PRACTICES_TEMPLATE._replace(
                 text=f"What are the best practices for {topic}?",
-                category="expansion",
-                relevance_score=0.75,
-                priority="medium",
                 reason=f"Best practices are commonly sought for '{topic}'"
             ))
         
         return suggestions
     
-    def _generate_deep_dive_suggestions(self, messages: List[Message]) -> List[Suggestion]:
-        """Generate deep-dive suggestions"""
+    def _generate_deep_dive_suggestions(
+        self,
+        last_assistant: Optional[Message]
+    ) -> List[Suggestion]:
+        """Generate deep-dive suggestions from the last assistant message"""
         suggestions = []
         
         # Check last assistant message for aspects to deep-dive
-        last_assistant = next((m for m in reversed(messages) if m.role == 'assistant'), None)
-        
         if last_assistant:
             # Look for numbered lists or bullet points
-            if re.search(r'[\d\-\*\•]', last_assistant.content):
-                suggestions.append(Suggestion(
-                    text="Can you explain the first point in more detail?",
-                    category="deep-dive",
-                    relevance_score=0.8,
-                    priority="medium",
-                    reason="Response contained multiple points worth exploring"
-                ))
+            if LIST_MARKER_PATTERN.search(last_assistant.content):
+                suggestions.append(FIRST_POINT_SUGGESTION)
             
             # Look for technical terms or concepts
-            if any(word in last_assistant.content.lower() for word in ['algorithm', 'architecture', 'design', 'pattern', 'system']):
-                suggestions.append(Suggestion(
-                    text="What are the trade-offs and considerations here?",
-                    category="deep-dive",
-                    relevance_score=0.85,
-                    priority="high",
-                    reason="Technical discussion suggests need for deeper analysis"
-                ))
+            if TECHNICAL_TERMS_PATTERN.search(last_assistant.content):
+                suggestions.append(TRADE_OFFS_SUGGESTION)
         
         return suggestions
     
-    def _generate_related_suggestions(self, topics: List[str]) -> List[Suggestion]:
+    def _generate_related_suggestions(self, topics: List[str]) -> Sequence[Suggestion]:
         """Generate suggestions for related topics"""
-        suggestions = []
-        
         # Common related topic patterns
         if topics:
-            suggestions.append(Suggestion(
-                text="What are some common pitfalls to avoid?",
-                category="related",
-                relevance_score=0.7,
-                priority="medium",
-                reason="Understanding pitfalls helps avoid mistakes"
-            ))
-            
-            suggestions.append(Suggestion(
-                text="Are there any alternatives or better approaches?",
-                category="related",
-                relevance_score=0.75,
-                priority="medium",
-                reason="Exploring alternatives provides broader perspective"
-            ))
-        
-        return suggestions
+            return RELATED_SUGGESTIONS
+        return ()
     
-    def _generate_next_step_suggestions(self, messages: List[Message]) -> List[Suggestion]:
+    def _generate_next_step_suggestions(self, messages: List[Message]) -> Sequence[Suggestion]:
         """Generate next-step suggestions for actionable conversations"""
-        suggestions = []
-        
-        suggestions.append(Suggestion(
-            text="What should I do first to get started?",
-            category="next-step",
-            relevance_score=0.9,
-            priority="high",
-            reason="Actionable conversation needs clear next steps"
-        ))
-        
-        suggestions.append(Suggestion(
-            text="What tools or resources do I need for this?",
-            category="next-step",
-            relevance_score=0.85,
-            priority="high",
-            reason="Implementation requires proper tools and resources"
-        ))
-        
-        suggestions.append(Suggestion(
-            text="How long would this typically take to implement?",
-            category="next-step",
-            relevance_score=0.75,
-            priority="medium",
-            reason="Time estimation helps with planning"
-        ))
-        
-        return suggestions
+        return NEXT_STEP_SUGGESTIONS
     
-    def _generate_new_direction_suggestions(self, topics: List[str]) -> List[Suggestion]:
+    def _generate_new_direction_suggestions(self, topics: List[str]) -> Sequence[Suggestion]:
         """Generate suggestions for new conversation directions"""
-        suggestions = []
-        
-        suggestions.append(Suggestion(
-            text="What else can I learn about this topic?",
-            category="new-direction",
-            relevance_score=0.6,
-            priority="low",
-            reason="Conversation appears complete, suggesting new exploration"
-        ))
-        
         if topics:
-            suggestions.append(Suggestion(
-                text=f"How does this relate to real-world applications?",
-                category="new-direction",
-                relevance_score=0.65,
-                priority="low",
-                reason="Connecting theory to practice is valuable"
-            ))
-        
-        return suggestions
+            return NEW_DIRECTION_SUGGESTIONS
+        return NEW_DIRECTION_SUGGESTIONS[:1]
     
     def _default_suggestions(self) -> List[Suggestion]:
         """Return default suggestions for empty conversations"""
-        return [
-            Suggestion(
-                text="What can you help me with?",
-                category="general",
-                relevance_score=0.5,
-                priority="medium",
-                reason="Starting a new conversation"
-            ),
-            Suggestion(
-                text="I need help with...",
-                category="general",
-                relevance_score=0.5,
-                priority="medium",
-                reason="General help request"
-            ),
-            Suggestion(
-                text="Can you explain...",
-                category="general",
-                relevance_score=0.5,
-                priority="medium",
-                reason="Seeking explanation"
-            )
-        ]
+        return list(DEFAULT_SUGGESTIONS)
     
     def _ai_generate_suggestions(
         self,
@@ -491,40 +701,56 @@ class ConversationSuggestionEngine:
             should_close = True
         
         try:
-            # Mark old suggestions as expired
-            old_suggestions = db.query(ConversationSuggestion).filter(
-                ConversationSuggestion.conversation_id == conversation_id,
-                ConversationSuggestion.was_used == False,
-                ConversationSuggestion.expires_at == None
-            ).all()
+            now = datetime.utcnow()
             
-            for old_sug in old_suggestions:
-                old_sug.expires_at = datetime.utcnow()
+            # Mark old suggestions that are still live as expired in a single
+            # UPDATE (saved suggestions carry a future expiry, not NULL)
+            db.execute(
+                update(ConversationSuggestion)
+                .where(
+                    ConversationSuggestion.conversation_id == conversation_id,
+                    ConversationSuggestion.was_used == False,
+                    or_(
+                        ConversationSuggestion.expires_at.is_(None),
+                        ConversationSuggestion.expires_at > now
+                    )
+                )
+                .values(expires_at=now)
+                .execution_options(synchronize_session=False)
+            )
             
-            # Save new suggestions
+            # Save new suggestions with one multi-row INSERT ... RETURNING
             saved_suggestions = []
-            for rank, suggestion in enumerate(suggestions, 1):
-                db_suggestion = ConversationSuggestion(
-                    conversation_id=conversation_id,
-                    user_id=user_id,
-                    suggestion_type='continuation',
-                    suggestion_text=suggestion.text,
-                    suggestion_category=suggestion.category,
-                    context_messages=context_message_ids,
-                    relevance_score=suggestion.relevance_score,
-                    rank=rank,
-                    priority=suggestion.priority,
-                    generation_reason=suggestion.reason,
-                    expires_at=datetime.utcnow() + timedelta(hours=24)
+            if suggestions:
+                expires_at = now + timedelta(hours=24)
+                rows = [
+                    {
+                        'conversation_id': conversation_id,
+                        'user_id': user_id,
+                        'suggestion_type': 'continuation',
+                        'suggestion_text': suggestion.text,
+                        'suggestion_category': suggestion.category,
+                        'context_messages': context_message_ids,
+                        'relevance_score': suggestion.relevance_score,
+                        'rank': rank,
+                        'priority': suggestion.priority,
+                        'generation_reason': suggestion.reason,
+                        'expires_at': expires_at
+                    }
+                    for rank, suggestion in enumerate(suggestions, 1)
+                ]
+                # RETURNING order isn't guaranteed when batched; rank restores it
+                saved_suggestions = sorted(
+                    db.scalars(insert(ConversationSuggestion).returning(ConversationSuggestion), rows),
+                    key=attrgetter('rank')
                 )
-                db.add(db_suggestion)
-                saved_suggestions.append(db_suggestion)
             
-            db.commit()
+            if should_close:
+                # Detach before commit so the returned rows aren't expired
+                for sug in saved_suggestions:
+                    db.expunge(sug)
             
-            # Refresh all
-            for sug in saved_suggestions:
-                db.refresh(sug)
+            db.commit()
             
             return saved_suggestions
             
@@ -554,8 +780,8 @@ def generate_conversation_suggestions(
     """
     from backend.database.operations import MessageDB
     
-    # Get messages
-    messages = MessageDB.get_messages(conversation_id)
+    # Get messages (only the columns the rule engine reads)
+    messages = MessageDB.get_messages_light(conversation_id)
     
     if not messages:
         return []
@@ -590,15 +816,27 @@ def get_active_suggestions(conversation_id: int) -> List[ConversationSuggestion]
         conversation_id: Conversation ID
     
     Returns:
-        List of active suggestions
+        List of active suggestions (only the columns needed for display are loaded)
     """
     db = get_db()
     try:
         now = datetime.utcnow()
-        return db.query(ConversationSuggestion).filter(
+        return db.query(ConversationSuggestion).options(
+            load_only(
+                ConversationSuggestion.id,
+                ConversationSuggestion.suggestion_text,
+                ConversationSuggestion.suggestion_category,
+                ConversationSuggestion.relevance_score,
+                ConversationSuggestion.rank,
+                ConversationSuggestion.priority
+            )
+        ).filter(
             ConversationSuggestion.conversation_id == conversation_id,
             ConversationSuggestion.was_used == False,
-            (ConversationSuggestion.expires_at == None) | (ConversationSuggestion.expires_at > now)
+            or_(
+                ConversationSuggestion.expires_at.is_(None),
+                ConversationSuggestion.expires_at > now
+            )
         ).order_by(ConversationSuggestion.rank).all()
     finally:
         db.close()
@@ -3,17 +3,125 @@ Conversation Summarization System
 Generates multi-level summaries with key insights extraction
 """
 
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from dataclasses import dataclass
-import re
+from collections import OrderedDict
 from datetime import datetime
+import re
+import threading
+import time
 
 from backend.database.models import Message, Conversation
 from backend.database.conversation_insights_models import ConversationSummary
-from backend.database.operations import get_db
+from backend.database.operations import MessageDB, get_db
+from backend.core.conversation_insights import compute_content_hash
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 
+# Markers that flag an assistant sentence as a key point (matched on lowercased
+# text), each with the literal it cannot match without. Most messages contain
+# none of these, and a substring check is several times cheaper than a regex
+# scan, so the literal gates the marker
+IMPORTANT_MARKERS = [
+    ('important', re.compile(r'\bimportant\b')),
+    ('key point', re.compile(r'\bkey point\b')),
+    ('main', re.compile(r'\bmain.*(?:idea|point|topic)\b')),
+    ('crucial', re.compile(r'\bcrucial\b')),
+    ('essential', re.compile(r'\bessential\b')),
+    ('significant', re.compile(r'\bsignificant\b'))
+]
+
+# Phrases introducing a decision; group 1 captures the decision text.
+# An optional colon is written \s*(?::\s*)? rather than \s*:?\s*: both accept
+# the same text in the same order, but the latter lets the two \s* split a
+# whitespace run every possible way, quadratic on long runs of newlines
+DECISION_PATTERNS = [
+    re.compile(r"(?:decided|decided to|decision|chose to|will|going to|agreed to)\s+(.{10,100})", re.IGNORECASE),
+    re.compile(r"(?:let's|we'll|we will|we should)\s+(.{10,100})", re.IGNORECASE),
+    re.compile(r"(?:final decision|conclusion|determined that)\s*(?::\s*)?(.{10,100})", re.IGNORECASE)
+]
+
+# Phrases introducing an action item; group 1 captures the task text
+ACTION_PATTERNS = [
+    re.compile(r"(?:need to|should|must|have to|action|task|todo|to-do)\s*(?::\s*)?(.{10,100})", re.IGNORECASE),
+    re.compile(r"(?:next steps?|follow[- ]?up)\s*(?::\s*)?(.{10,100})", re.IGNORECASE),
+    re.compile(r"(?:\[\s*\]|\[ \])\s*(.{10,100})", re.IGNORECASE)  # Checkbox pattern
+]
+
+# Literals one of which must occur for the matching pattern above to match
+DECISION_TRIGGERS = [
+    ('decided', 'decision', 'chose to', 'will', 'going to', 'agreed to'),
+    ("let's", "we'll", 'we will', 'we should'),
+    ('final decision', 'conclusion', 'determined that')
+]
+ACTION_TRIGGERS = [
+    ('need to', 'should', 'must', 'have to', 'action', 'task', 'todo', 'to-do'),
+    ('next step', 'follow'),
+    ('[',)
+]
+
+# Case-sensitive twins of the decision/action patterns, for lowercased ASCII
+# text, paired with their trigger literals. Their keywords are all lowercase,
+# and without re.IGNORECASE the regex engine can skip ahead to positions
+# starting with a keyword's first letter instead of trying every alternative
+# at every offset (several times faster); the triggers skip it altogether
+DECISION_PATTERNS_LOWER = [
+    (triggers, re.compile(pattern.pattern))
+    for triggers, pattern in zip(DECISION_TRIGGERS, DECISION_PATTERNS)
+]
+ACTION_PATTERNS_LOWER = [
+    (triggers, re.compile(pattern.pattern))
+    for triggers, pattern in zip(ACTION_TRIGGERS, ACTION_PATTERNS)
+]
+
+# How many of each extracted item a summary keeps
+MAX_KEY_POINTS = 5
+MAX_DECISIONS = 5
+MAX_ACTION_ITEMS = 7
+MAX_QUESTIONS = 5
+
+# Sentences ending with a question mark. The lookbehind only lets a match
+# start at the beginning of the text or right after [.!?], which is where
+# every match of the bare [^.!?]*\? starts anyway; without it the engine
+# rescans each statement once per character, quadratic in its length
+QUESTION_PATTERN = re.compile(r'(?<![^.!?])[^.!?]*\?')
+
+# Sentence boundaries
+SENTENCE_SPLIT_PATTERN = re.compile(r'[.!?]+')
+
+
+def _iter_captures(
+    content: str,
+    content_lower: Optional[str],
+    patterns: List[re.Pattern],
+    patterns_lower: List[Tuple[Tuple[str, ...], re.Pattern]]
+):
+    """Yield group 1 of every match of each pattern in turn, as in pattern.finditer"""
+    if content.isascii():
+        # ASCII lowercasing keeps offsets, so spans index the original text
+        for triggers, pattern in patterns_lower:
+            if not any(trigger in content_lower for trigger in triggers):
+                continue
+            for match in pattern.finditer(content_lower):
+                yield content[match.start(1):match.end(1)]
+    else:
+        for pattern in patterns:
+            for match in pattern.finditer(content):
+                yield match.group(1)
+
+
+def _up_to_terminator(text: str) -> str:
+    """Return text up to its first '.', '!' or '?' (all of it if there is none)"""
+    end = len(text)
+    for terminator in '.!?':
+        # Each search only needs to cover what precedes the best cut so far
+        index = text.find(terminator, 0, end)
+        if index >= 0:
+            end = index
+    return text[:end]
+
+
 @dataclass
 class SummaryResult:
     """Result of summarization"""
@@ -28,6 +136,37 @@ class SummaryResult:
     message_count: int
 
 
+@dataclass
+class ConversationStats:
+    """Message statistics gathered in one pass, shared by the summary generators"""
+    message_count: int
+    user_count: int
+    first_user_msg: Optional[Message]
+    total_chars: int
+
+
+# Speaker labels for the roles included in a formatted transcript
+ROLE_LABELS = {'user': 'User', 'assistant': 'Assistant'}
+
+# Saved summaries by conversation_id with their expiry time, kept current
+# by save_summary, so repeated views of a conversation don't query the
+# database. The TTL bounds how long another process's update goes unseen.
+SUMMARY_CACHE_SIZE = 1024
+SUMMARY_CACHE_TTL = 60.0
+_summary_cache: "OrderedDict[int, Tuple[ConversationSummary, float]]" = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+# Bump when rule-based output changes, so stored summaries are regenerated
+SUMMARIZER_VERSION = 1
+
+# Columns an upsert overwrites when a conversation is summarized again
+SUMMARY_UPDATE_COLUMNS = (
+    'short_summary', 'medium_summary', 'detailed_summary',
+    'key_points', 'decisions_made', 'action_items', 'questions_asked',
+    'message_count', 'confidence_score', 'content_hash'
+)
+
+
 class ConversationSummarizer:
     """
     Generates intelligent summaries of conversations
@@ -67,29 +206,24 @@ class ConversationSummarizer:
         if not messages:
             return self._empty_summary()
         
-        # Extract conversation text
-        conversation_text = self._format_conversation(messages)
-        
         if use_ai and self.llm_provider:
-            return self._ai_summarize(messages, conversation_text)
+            return self._ai_summarize(messages)
         else:
-            return self._rule_based_summarize(messages, conversation_text)
+            return self._rule_based_summarize(messages)
     
-    def _ai_summarize(
-        self,
-        messages: List[Message],
-        conversation_text: str
-    ) -> SummaryResult:
+    def _ai_summarize(self, messages: List[Message]) -> SummaryResult:
         """
         Use AI to generate comprehensive summary
         
         Args:
             messages: List of messages
-            conversation_text: Formatted conversation
         
         Returns:
             SummaryResult
         """
+        # Only the AI path needs the formatted transcript
+        conversation_text = self._format_conversation(messages)
+        
         # Build prompt for AI summarization
         prompt = self._build_summarization_prompt(conversation_text)
         
@@ -97,37 +231,31 @@ class ConversationSummarizer:
             # Call LLM (this would integrate with your existing LLM system)
             # For now, we'll use rule-based as fallback
             # TODO: Integrate with actual LLM provider
-            return self._rule_based_summarize(messages, conversation_text)
+            return self._rule_based_summarize(messages)
         except Exception as e:
             print(f"AI summarization failed: {e}, falling back to rule-based")
-            return self._rule_based_summarize(messages, conversation_text)
+            return self._rule_based_summarize(messages)
     
-    def _rule_based_summarize(
-        self,
-        messages: List[Message],
-        conversation_text: str
-    ) -> SummaryResult:
+    def _rule_based_summarize(self, messages: List[Message]) -> SummaryResult:
         """
         Generate summary using rule-based extraction
         
         Args:
             messages: List of messages
-            conversation_text: Formatted conversation
         
         Returns:
             SummaryResult
         """
         # Extract components
-        key_points = self._extract_key_points(messages)
-        decisions = self._extract_decisions(messages)
-        action_items = self._extract_action_items(messages)
-        questions = self._extract_questions(messages)
+        key_points, decisions, action_items, questions = self._extract_all(messages)
+        
+        stats = self._conversation_stats(messages)
         
         # Generate summaries at different levels
-        short_summary = self._generate_short_summary(messages, key_points)
-        medium_summary = self._generate_medium_summary(messages, key_points, decisions)
+        short_summary = self._generate_short_summary(stats, key_points)
+        medium_summary = self._generate_medium_summary(stats, key_points, decisions)
         detailed_summary = self._generate_detailed_summary(
-            messages, key_points, decisions, action_items, questions
+            stats, key_points, decisions, action_items, questions
         )
         
         return SummaryResult(
@@ -144,136 +272,178 @@ class ConversationSummarizer:
     
     def _format_conversation(self, messages: List[Message]) -> str:
         """Format conversation for processing"""
-        formatted = []
-        for msg in messages:
-            if msg.role in ['user', 'assistant']:
-                role = "User" if msg.role == "user" else "Assistant"
-                formatted.append(f"{role}: {msg.content}")
-        return "\n\n".join(formatted)
+        return "\n\n".join(
+            f"{ROLE_LABELS[msg.role]}: {msg.content}"
+            for msg in messages
+            if msg.role in ROLE_LABELS
+        )
     
-    def _extract_key_points(self, messages: List[Message]) -> List[str]:
-        """Extract key points from conversation"""
-        key_points = []
-        
-        # Look for important markers
-        important_markers = [
-            r'\bimportant\b',
-            r'\bkey point\b',
-            r'\bmain.*(?:idea|point|topic)\b',
-            r'\bcrucial\b',
-            r'\bessential\b',
-            r'\bsignificant\b'
-        ]
+    def _extract_all(
+        self,
+        messages: List[Message]
+    ) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """
+        Extract key points, decisions, action items and questions in a
+        single pass over the messages
         
-        for msg in messages:
-            if msg.role == 'assistant':
-                content = msg.content.lower()
-                
-                # Check for importance markers
-                for marker in important_markers:
-                    if re.search(marker, content):
-                        # Extract sentence containing the marker
-                        sentences = self._split_sentences(msg.content)
-                        for sent in sentences:
-                            if re.search(marker, sent.lower()):
-                                key_points.append(sent.strip())
-                                break
-                
-                # Also extract first sentence of longer assistant messages
-                if len(msg.content) > 200 and not key_points:
-                    sentences = self._split_sentences(msg.content)
-                    if sentences:
-                        key_points.append(sentences[0].strip())
-        
-        # Deduplicate and limit
-        key_points = list(dict.fromkeys(key_points))[:5]
-        return key_points
-    
-    def _extract_decisions(self, messages: List[Message]) -> List[str]:
-        """Extract decisions made during conversation"""
-        decisions = []
+        Args:
+            messages: List of messages
         
-        decision_patterns = [
-            r"(?:decided|decided to|decision|chose to|will|going to|agreed to)\s+(.{10,100})",
-            r"(?:let's|we'll|we will|we should)\s+(.{10,100})",
-            r"(?:final decision|conclusion|determined that)\s*:?\s*(.{10,100})"
-        ]
+        Returns:
+            Tuple of (key_points, decisions, action_items, questions)
+        """
+        # Insertion-ordered dicts double as deduplicating sets; every list
+        # stops growing at its limit and the scan ends once all are full
+        key_points = {}
+        decisions = {}
+        action_items = {}
+        questions = []
         
         for msg in messages:
+            if (len(key_points) >= MAX_KEY_POINTS
+                    and len(decisions) >= MAX_DECISIONS
+                    and len(action_items) >= MAX_ACTION_ITEMS
+                    and len(questions) >= MAX_QUESTIONS):
+                break
+            
             content = msg.content
-            for pattern in decision_patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                for match in matches:
-                    decision_text = match.group(1).strip()
-                    # Clean up and truncate
-                    decision_text = re.split(r'[.!?]', decision_text)[0]
-                    if len(decision_text) > 15:
-                        decisions.append(decision_text)
-        
-        # Deduplicate and limit
-        decisions = list(dict.fromkeys(decisions))[:5]
-        return decisions
-    
-    def _extract_action_items(self, messages: List[Message]) -> List[str]:
-        """Extract action items and tasks"""
-        action_items = []
-        
-        action_patterns = [
-            r"(?:need to|should|must|have to|action|task|todo|to-do)\s*:?\s*(.{10,100})",
-            r"(?:next steps?|follow[- ]?up)\s*:?\s*(.{10,100})",
-            r"(?:\[\s*\]|\[ \])\s*(.{10,100})"  # Checkbox pattern
-        ]
+            want_key_points = msg.role == 'assistant' and len(key_points) < MAX_KEY_POINTS
+            want_decisions = len(decisions) < MAX_DECISIONS
+            want_actions = len(action_items) < MAX_ACTION_ITEMS
+            
+            # Once the lists fill up, most messages need no lowered copy;
+            # the capture patterns only read it for ASCII text
+            content_lower = None
+            if want_key_points or ((want_decisions or want_actions) and content.isascii()):
+                content_lower = content.lower()
+            
+            if want_key_points:
+                self._collect_key_points(content, content_lower, key_points)
+            elif msg.role == 'user':
+                # Limit to most recent/important questions
+                if len(questions) < MAX_QUESTIONS:
+                    self._collect_questions(content, questions)
+            
+            # Decisions and action items can come from either side
+            if want_decisions:
+                self._collect_captures(
+                    content, content_lower, DECISION_PATTERNS, DECISION_PATTERNS_LOWER,
+                    15, decisions, MAX_DECISIONS
+                )
+            if want_actions:
+                self._collect_captures(
+                    content, content_lower, ACTION_PATTERNS, ACTION_PATTERNS_LOWER,
+                    10, action_items, MAX_ACTION_ITEMS
+                )
         
-        for msg in messages:
-            content = msg.content
-            for pattern in action_patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                for match in matches:
-                    action_text = match.group(1).strip()
-                    # Clean up
-                    action_text = re.split(r'[.!?]', action_text)[0]
-                    if len(action_text) > 10:
-                        action_items.append(action_text)
-        
-        # Deduplicate and limit
-        action_items = list(dict.fromkeys(action_items))[:7]
-        return action_items
+        return list(key_points), list(decisions), list(action_items), questions
     
-    def _extract_questions(self, messages: List[Message]) -> List[str]:
-        """Extract important questions asked"""
-        questions = []
-        
-        for msg in messages:
-            if msg.role == 'user':
-                # Find questions (sentences ending with ?)
-                content = msg.content
-                potential_questions = re.findall(r'[^.!?]*\?', content)
-                
-                for q in potential_questions:
-                    q = q.strip()
-                    if len(q) > 10 and len(q) < 200:
-                        questions.append(q)
-        
-        # Limit to most recent/important questions
-        questions = questions[:5]
-        return questions
+    def _collect_key_points(self, content: str, content_lower: str, key_points: Dict[str, None]):
+        """Add key points found in an assistant message, up to MAX_KEY_POINTS"""
+        spans = None
+        
+        # Check for importance markers
+        for keyword, marker in IMPORTANT_MARKERS:
+            if keyword not in content_lower or not marker.search(content_lower):
+                continue
+            
+            if spans is None:
+                # Sentences are handled as spans, so only matching ones are copied
+                spans = list(self._iter_sentence_spans(content))
+                is_ascii = content.isascii()
+            
+            # Extract sentence containing the marker
+            for start, end in spans:
+                if is_ascii:
+                    # Same offsets in the lowered copy; searching a
+                    # span sees the same word boundaries as a slice
+                    found = marker.search(content_lower, start, end)
+                else:
+                    found = marker.search(content[start:end].lower())
+                if found:
+                    sent = content[start:end].strip()
+                    if sent:
+                        key_points[sent] = None
+                        if len(key_points) >= MAX_KEY_POINTS:
+                            return
+                        break
+        
+        # Also extract first sentence of longer assistant messages
+        if len(content) > 200 and not key_points:
+            for start, end in self._iter_sentence_spans(content):
+                sent = content[start:end].strip()
+                if sent:
+                    key_points[sent] = None
+                    break
+    
+    def _collect_questions(self, content: str, questions: List[str]):
+        """Append questions asked in a user message, up to MAX_QUESTIONS"""
+        # Find questions (sentences ending with ?); a plain substring check
+        # rules out the many messages that contain none
+        if '?' not in content:
+            return
+        for match in QUESTION_PATTERN.finditer(content):
+            start, end = match.span()
+            # Stripping can only shorten a match, so short ones are skipped
+            # without being copied
+            if end - start <= 10:
+                continue
+            q = content[start:end].strip()
+            if len(q) > 10 and len(q) < 200:
+                questions.append(q)
+                if len(questions) >= MAX_QUESTIONS:
+                    return
+    
+    def _collect_captures(
+        self,
+        content: str,
+        content_lower: Optional[str],
+        patterns: List[re.Pattern],
+        patterns_lower: List[Tuple[Tuple[str, ...], re.Pattern]],
+        min_length: int,
+        items: Dict[str, None],
+        limit: int
+    ):
+        """Add captured decision/action texts longer than min_length, up to limit"""
+        for text in _iter_captures(content, content_lower, patterns, patterns_lower):
+            # Clean up and truncate
+            text = _up_to_terminator(text.strip())
+            if len(text) > min_length:
+                items[text] = None
+                if len(items) >= limit:
+                    return
+    
+    def _conversation_stats(self, messages: List[Message]) -> ConversationStats:
+        """Count messages and characters and find the first user message"""
+        # Read each role once; counting and locating then run at C level
+        roles = [msg.role for msg in messages]
+        user_count = roles.count('user')
+        first_user_msg = messages[roles.index('user')] if user_count else None
+        total_chars = sum(len(msg.content) for msg in messages)
+        
+        return ConversationStats(
+            message_count=len(messages),
+            user_count=user_count,
+            first_user_msg=first_user_msg,
+            total_chars=total_chars
+        )
     
     def _generate_short_summary(
         self,
-        messages: List[Message],
+        stats: ConversationStats,
         key_points: List[str]
     ) -> str:
         """Generate 1-2 sentence summary"""
-        if not messages:
+        if not stats.message_count:
             return "Empty conversation"
         
         # Get first user message as topic indicator
-        first_user_msg = next((m for m in messages if m.role == 'user'), None)
+        first_user_msg = stats.first_user_msg
         
         if first_user_msg:
             first_content = first_user_msg.content[:100]
-            msg_count = len(messages)
-            user_msg_count = sum(1 for m in messages if m.role == 'user')
+            msg_count = stats.message_count
+            user_msg_count = stats.user_count
             
             # Generate concise summary
             if key_points:
@@ -281,11 +451,11 @@ class ConversationSummarizer:
             else:
                 return f"Conversation with {user_msg_count} user queries and {msg_count - user_msg_count} responses"
         
-        return f"Conversation with {len(messages)} messages"
+        return f"Conversation with {stats.message_count} messages"
     
     def _generate_medium_summary(
         self,
-        messages: List[Message],
+        stats: ConversationStats,
         key_points: List[str],
         decisions: List[str]
     ) -> str:
@@ -293,7 +463,7 @@ class ConversationSummarizer:
         summary_parts = []
         
         # Get conversation topic from first messages
-        first_user_msg = next((m for m in messages if m.role == 'user'), None)
+        first_user_msg = stats.first_user_msg
         if first_user_msg:
             topic = first_user_msg.content[:150]
             summary_parts.append(f"This conversation discusses {topic}...")
@@ -307,15 +477,15 @@ class ConversationSummarizer:
             summary_parts.append(f"Key decisions: {decisions[0]}")
         
         # Add message statistics
-        msg_count = len(messages)
-        user_count = sum(1 for m in messages if m.role == 'user')
+        msg_count = stats.message_count
+        user_count = stats.user_count
         summary_parts.append(f"The conversation consisted of {user_count} user messages and {msg_count - user_count} assistant responses")
         
         return ". ".join(summary_parts) + "."
     
     def _generate_detailed_summary(
         self,
-        messages: List[Message],
+        stats: ConversationStats,
         key_points: List[str],
         decisions: List[str],
         action_items: List[str],
@@ -325,7 +495,7 @@ class ConversationSummarizer:
         sections = []
         
         # Overview
-        first_user_msg = next((m for m in messages if m.role == 'user'), None)
+        first_user_msg = stats.first_user_msg
         if first_user_msg:
             sections.append(f"**Overview:**\n{first_user_msg.content[:200]}...")
         
@@ -346,9 +516,9 @@ class ConversationSummarizer:
             sections.append("**Questions Addressed:**\n" + "\n".join(f"- {q}" for q in questions[:3]))
         
         # Statistics
-        msg_count = len(messages)
-        user_count = sum(1 for m in messages if m.role == 'user')
-        total_chars = sum(len(m.content) for m in messages)
+        msg_count = stats.message_count
+        user_count = stats.user_count
+        total_chars = stats.total_chars
         sections.append(f"\n**Statistics:**\n- Total messages: {msg_count}\n- User messages: {user_count}\n- Assistant responses: {msg_count - user_count}\n- Total characters: {total_chars:,}")
         
         return "\n\n".join(sections)
@@ -371,10 +541,13 @@ Please provide:
 
 Format your response as JSON."""
     
-    def _split_sentences(self, text: str) -> List[str]:
-        """Split text into sentences"""
-        sentences = re.split(r'[.!?]+', text)
-        return [s.strip() for s in sentences if s.strip()]
+    def _iter_sentence_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start, end) offsets of the sentences in text, unstripped"""
+        last = 0
+        for match in SENTENCE_SPLIT_PATTERN.finditer(text):
+            yield last, match.start()
+            last = match.end()
+        yield last, len(text)
     
     def _empty_summary(self) -> SummaryResult:
         """Return empty summary"""
@@ -395,7 +568,8 @@ Format your response as JSON."""
         conversation_id: int,
         user_id: int,
         summary_result: SummaryResult,
-        db: Optional[Session] = None
+        db: Optional[Session] = None,
+        content_hash: Optional[str] = None
     ) -> ConversationSummary:
         """
         Save summary to database
@@ -405,6 +579,8 @@ Format your response as JSON."""
             user_id: User ID
             summary_result: Summary result to save
             db: Database session (optional)
+            content_hash: Fingerprint of the summarized messages (see
+                summary_fingerprint)
         
         Returns:
             ConversationSummary model
@@ -415,45 +591,48 @@ Format your response as JSON."""
             should_close = True
         
         try:
-            # Check if summary already exists
-            existing = db.query(ConversationSummary).filter(
-                ConversationSummary.conversation_id == conversation_id
-            ).first()
-            
-            if existing:
-                # Update existing summary
-                existing.short_summary = summary_result.short_summary
-                existing.medium_summary = summary_result.medium_summary
-                existing.detailed_summary = summary_result.detailed_summary
-                existing.key_points = summary_result.key_points
-                existing.decisions_made = summary_result.decisions_made
-                existing.action_items = summary_result.action_items
-                existing.questions_asked = summary_result.questions_asked
-                existing.message_count = summary_result.message_count
-                existing.confidence_score = summary_result.confidence_score
-                existing.updated_at = datetime.utcnow()
-                
-                summary = existing
-            else:
-                # Create new summary
-                summary = ConversationSummary(
-                    conversation_id=conversation_id,
-                    user_id=user_id,
-                    short_summary=summary_result.short_summary,
-                    medium_summary=summary_result.medium_summary,
-                    detailed_summary=summary_result.detailed_summary,
-                    key_points=summary_result.key_points,
-                    decisions_made=summary_result.decisions_made,
-                    action_items=summary_result.action_items,
-                    questions_asked=summary_result.questions_asked,
-                    message_count=summary_result.message_count,
-                    confidence_score=summary_result.confidence_score,
-                    generation_method='rule_based'
-                )
-                db.add(summary)
+            # Insert or update in one INSERT ... ON CONFLICT ... RETURNING
+            # (conversation_id is unique), instead of SELECT, UPDATE, SELECT
+            dialect_insert = postgresql.insert if db.bind.dialect.name == 'postgresql' else sqlite.insert
+            stmt = dialect_insert(ConversationSummary).values(
+                conversation_id=conversation_id,
+                user_id=user_id,
+                short_summary=summary_result.short_summary,
+                medium_summary=summary_result.medium_summary,
+                detailed_summary=summary_result.detailed_summary,
+                key_points=summary_result.key_points,
+                decisions_made=summary_result.decisions_made,
+                action_items=summary_result.action_items,
+                questions_asked=summary_result.questions_asked,
+                message_count=summary_result.message_count,
+                confidence_score=summary_result.confidence_score,
+                generation_method='rule_based',
+                content_hash=content_hash
+            )
+            # An existing summary keeps its owner, creation time and method
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ConversationSummary.conversation_id],
+                set_={
+                    **{column: stmt.excluded[column] for column in SUMMARY_UPDATE_COLUMNS},
+                    # Naive UTC like the column's Python-side defaults
+                    'updated_at': datetime.utcnow()
+                }
+            ).returning(ConversationSummary)
+            summary = db.scalars(
+                stmt, execution_options={'populate_existing': True}
+            ).one()
             
+            if should_close:
+                # Detach before commit so the returned row isn't expired
+                db.expunge(summary)
             db.commit()
-            db.refresh(summary)
+            
+            # Keep get_conversation_summary current; a row still bound to the
+            # caller's session is expired by the commit, so it isn't cached
+            if should_close:
+                _cache_summary(summary)
+            else:
+                forget_conversation_summary(conversation_id)
             return summary
             
         finally:
@@ -462,10 +641,24 @@ Format your response as JSON."""
 
 
 # Convenience functions
+def summary_fingerprint(messages: List[Message]) -> str:
+    """
+    Digest of the messages and summarizer version behind a summary
+    
+    Args:
+        messages: List of messages
+    
+    Returns:
+        String that changes whenever the conversation or summarizer changes
+    """
+    return f"v{SUMMARIZER_VERSION}:{compute_content_hash(messages)}"
+
+
 def summarize_conversation(
     conversation_id: int,
     user_id: int,
-    use_ai: bool = False
+    use_ai: bool = False,
+    force: bool = False
 ) -> Optional[ConversationSummary]:
     """
     Summarize a conversation and save to database
@@ -474,18 +667,25 @@ def summarize_conversation(
         conversation_id: Conversation ID
         user_id: User ID
         use_ai: Use AI for summarization
+        force: Regenerate even if the saved summary is current
     
     Returns:
         ConversationSummary model
     """
-    from backend.database.operations import MessageDB
-    
     # Get messages
     messages = MessageDB.get_messages(conversation_id)
     
     if not messages:
         return None
     
+    # Rule-based summaries are deterministic, so a summary of exactly these
+    # messages by this summarizer version is returned without recomputing
+    content_hash = summary_fingerprint(messages)
+    if not use_ai and not force:
+        existing = get_conversation_summary(conversation_id)
+        if existing and existing.content_hash == content_hash:
+            return existing
+    
     # Create summarizer
     summarizer = ConversationSummarizer()
     
@@ -498,7 +698,9 @@ def summarize_conversation(
     )
     
     # Save to database
-    return summarizer.save_summary(conversation_id, user_id, summary_result)
+    return summarizer.save_summary(
+        conversation_id, user_id, summary_result, content_hash=content_hash
+    )
 
 
 def get_conversation_summary(conversation_id: int) -> Optional[ConversationSummary]:
@@ -511,11 +713,38 @@ def get_conversation_summary(conversation_id: int) -> Optional[ConversationSumma
     Returns:
         ConversationSummary or None
     """
+    with _summary_cache_lock:
+        entry = _summary_cache.get(conversation_id)
+        if entry is not None:
+            summary, expires_at = entry
+            if expires_at > time.monotonic():
+                _summary_cache.move_to_end(conversation_id)
+                return summary
+            del _summary_cache[conversation_id]
+    
     db = get_db()
     try:
-        return db.query(ConversationSummary).filter(
+        summary = db.query(ConversationSummary).filter(
             ConversationSummary.conversation_id == conversation_id
         ).first()
     finally:
         db.close()
+    
+    if summary is not None:
+        _cache_summary(summary)
+    return summary
+
+
+def forget_conversation_summary(conversation_id: int):
+    """Drop a conversation's cached summary, e.g. when it is deleted"""
+    with _summary_cache_lock:
+        _summary_cache.pop(conversation_id, None)
+
 
+def _cache_summary(summary: ConversationSummary):
+    """Remember a detached summary for get_conversation_summary"""
+    with _summary_cache_lock:
+        _summary_cache[summary.conversation_id] = (summary, time.monotonic() + SUMMARY_CACHE_TTL)
+        _summary_cache.move_to_end(summary.conversation_id)
+        if len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
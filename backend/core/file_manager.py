@@ -1,15 +1,41 @@
 """
 Core File Manager - Coordinates file operations, storage, and parsing
 """
+import asyncio
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, BinaryIO
 from datetime import datetime
 
+from backend.core.file_rag import FileRAG, TEXT_FILE_TYPES
 from backend.database.file_operations import FileDB, FileTagDB, ConversationFileDB
 from backend.utils.file_storage import file_storage, FileStorage
 from backend.utils.file_parser import file_parser, FileParser
 from backend.utils.thumbnail_generator import thumbnail_generator, ThumbnailGenerator
 
+# Worker pool for per-upload post-processing (thumbnailing runs here while
+# text extraction runs on the calling thread)
+_postprocess_executor = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="file-postprocess"
+)
+
+
+def _parse_creation_date(value: Any) -> Optional[datetime]:
+    """Convert a parser's 'created' metadata (ISO string or datetime) to a datetime"""
+    if isinstance(value, datetime):
+        return value
+    if not value or not isinstance(value, str):
+        return None
+    
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
 
 class FileManager:
     """
@@ -69,86 +95,130 @@ class FileManager:
                     'error': error_msg
                 }
             
+            content_hash = self.storage.compute_content_hash(file_data)
+            
+            # Identical content uploaded before: link the stored copy rather
+            # than writing it again, and reuse its extracted text below
+            duplicate = FileDB.find_by_hash(user_id, content_hash, file_type)
+            saved = None
+            if duplicate:
+                saved = self.storage.link_file(duplicate.file_path, original_filename, user_id)
+            
             # Save file to disk
-            file_path, unique_filename, _ = self.storage.save_file(
-                file_data, original_filename, user_id
-            )
+            if saved is None:
+                duplicate = None
+                saved = self.storage.save_file(file_data, original_filename, user_id)
+            file_path, unique_filename, _ = saved
             
-            full_path = self.storage.get_file_path(file_path)
+            return self._process_saved_file(
+                user_id=user_id,
+                original_filename=original_filename,
+                file_type=file_type,
+                mime_type=mime_type,
+                file_size=file_size,
+                file_path=file_path,
+                unique_filename=unique_filename,
+                content_hash=content_hash,
+                duplicate=duplicate,
+                description=description,
+                folder_path=folder_path,
+                enable_text_extraction=enable_text_extraction,
+                enable_thumbnail=enable_thumbnail,
+                enable_ocr=enable_ocr
+            )
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Failed to upload file: {str(e)}'
+            }
+    
+    def upload_stream(
+        self,
+        file_obj: BinaryIO,
+        original_filename: str,
+        user_id: int,
+        size: Optional[int] = None,
+        description: Optional[str] = None,
+        folder_path: str = "/",
+        enable_text_extraction: bool = True,
+        enable_thumbnail: bool = True,
+        enable_ocr: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Upload and process a file read from a binary stream
+        
+        The stream is copied to disk in fixed-size blocks and hashed on the
+        way, so the upload is never held in memory as a whole.
+        
+        Args:
+            file_obj: Readable binary file object
+            original_filename: Original filename
+            user_id: User ID
+            size: Size in bytes if known, used to reject oversized uploads early
+            description: Optional file description
+            folder_path: Virtual folder path
+            enable_text_extraction: Whether to extract text content
+            enable_thumbnail: Whether to generate thumbnail
+            enable_ocr: Whether to use OCR for images
+        
+        Returns:
+            Same dictionary as upload_file
+        """
+        try:
+            # Validate file type
+            if not self.storage.is_supported_file(original_filename):
+                return {
+                    'success': False,
+                    'error': 'Unsupported file type'
+                }
             
-            # Extract text if enabled
-            extracted_text = None
-            metadata = {}
-            if enable_text_extraction and file_type not in ['image']:
-                parse_result = self.parser.parse_file(full_path, file_type, enable_ocr=False)
-                if parse_result['success']:
-                    extracted_text = parse_result['text']
-                    metadata = parse_result.get('metadata', {})
+            # Get file info
+            file_type = self.storage.get_file_type(original_filename)
+            mime_type = self.storage.get_mime_type(original_filename)
+            max_size = self.storage.MAX_FILE_SIZES.get(
+                file_type, self.storage.MAX_FILE_SIZES['default']
+            )
             
-            # Extract text from images if OCR enabled
-            if enable_text_extraction and enable_ocr and file_type == 'image':
-                parse_result = self.parser.parse_image_ocr(full_path)
-                if parse_result['success']:
-                    extracted_text = parse_result['text']
-                    metadata = parse_result.get('metadata', {})
+            # Validate declared file size
+            if size is not None:
+                is_valid, error_msg = self.storage.validate_file_size(size, file_type)
+                if not is_valid:
+                    return {
+                        'success': False,
+                        'error': error_msg
+                    }
             
-            # Generate thumbnail if enabled
-            thumbnail_path = None
-            if enable_thumbnail:
-                thumb_dir = self.storage.get_thumbnails_directory(user_id)
-                thumb_filename = f"thumb_{unique_filename}"
-                if file_type not in ['image', 'pdf']:
-                    thumb_filename = f"thumb_{Path(unique_filename).stem}.jpg"
-                
-                thumb_full_path = thumb_dir / thumb_filename
-                
-                if self.thumbnail_gen.generate_thumbnail(full_path, file_type, thumb_full_path):
-                    thumbnail_path = str(thumb_full_path.relative_to(self.storage.base_dir))
+            # Save file to disk; copying stops once max_size is exceeded
+            file_path, unique_filename, file_size, content_hash = self.storage.save_stream(
+                file_obj, original_filename, user_id, max_size=max_size
+            )
+            if file_path is None:
+                _, error_msg = self.storage.validate_file_size(file_size, file_type)
+                return {
+                    'success': False,
+                    'error': error_msg
+                }
             
-            # Extract metadata fields
-            author = metadata.get('author')
-            creation_date = None
-            if 'created' in metadata and metadata['created']:
-                try:
-                    if isinstance(metadata['created'], str):
-                        creation_date = datetime.fromisoformat(metadata['created'].replace('Z', '+00:00'))
-                    elif isinstance(metadata['created'], datetime):
-                        creation_date = metadata['created']
-                except:
-                    pass
+            # Identical content uploaded before: reuse its extracted text
+            duplicate = FileDB.find_by_hash(user_id, content_hash, file_type)
             
-            # Create database record
-            file_record = FileDB.create_file(
+            return self._process_saved_file(
                 user_id=user_id,
-                filename=unique_filename,
                 original_filename=original_filename,
                 file_type=file_type,
                 mime_type=mime_type,
                 file_size=file_size,
                 file_path=file_path,
+                unique_filename=unique_filename,
+                content_hash=content_hash,
+                duplicate=duplicate,
                 description=description,
-                extracted_text=extracted_text,
-                thumbnail_path=thumbnail_path,
-                author=author,
-                creation_date=creation_date,
-                folder_path=folder_path
+                folder_path=folder_path,
+                enable_text_extraction=enable_text_extraction,
+                enable_thumbnail=enable_thumbnail,
+                enable_ocr=enable_ocr
             )
-            
-            return {
-                'success': True,
-                'file': {
-                    'id': file_record.id,
-                    'filename': file_record.filename,
-                    'original_filename': file_record.original_filename,
-                    'file_type': file_record.file_type,
-                    'file_size': file_record.file_size,
-                    'file_path': file_record.file_path,
-                    'thumbnail_path': file_record.thumbnail_path,
-                    'uploaded_at': file_record.uploaded_at.isoformat(),
-                    'has_text': bool(extracted_text),
-                    'text_preview': extracted_text[:200] if extracted_text else None
-                }
-            }
         
         except Exception as e:
             return {
@@ -156,9 +226,198 @@ class FileManager:
                 'error': f'Failed to upload file: {str(e)}'
             }
     
+    def _process_saved_file(
+        self,
+        user_id: int,
+        original_filename: str,
+        file_type: str,
+        mime_type: str,
+        file_size: int,
+        file_path: str,
+        unique_filename: str,
+        content_hash: str,
+        duplicate: Optional[Any],
+        description: Optional[str],
+        folder_path: str,
+        enable_text_extraction: bool,
+        enable_thumbnail: bool,
+        enable_ocr: bool
+    ) -> Dict[str, Any]:
+        """
+        Extract text, build the thumbnail and create the record for a file
+        already written to storage
+        
+        If duplicate is an earlier record with identical content, its
+        extracted text is reused instead of parsing again.
+        """
+        full_path = self.storage.get_file_path(file_path)
+        
+        # Start thumbnail generation in the background; it only reads the
+        # saved file, so it can overlap with text extraction below
+        thumb_future = None
+        if enable_thumbnail:
+            thumb_dir = self.storage.get_thumbnails_directory(user_id)
+            thumb_filename = f"thumb_{unique_filename}"
+            if file_type not in ['image', 'pdf']:
+                thumb_filename = f"thumb_{Path(unique_filename).stem}.jpg"
+            
+            thumb_full_path = thumb_dir / thumb_filename
+            thumb_future = _postprocess_executor.submit(
+                self._generate_thumbnail, full_path, file_type, content_hash, thumb_full_path
+            )
+        
+        # Extract text if enabled
+        extracted_text = None
+        metadata = {}
+        parse_result = None
+        parser_version = None
+        parse_status = None
+        reuse_text = (
+            duplicate is not None and duplicate.has_text and enable_text_extraction
+            and (file_type != 'image' or enable_ocr)
+        )
+        if reuse_text:
+            extracted_text = duplicate.extracted_text
+            metadata = {'author': duplicate.author, 'created': duplicate.creation_date}
+            parser_version = duplicate.parser_version
+            parse_status = duplicate.parse_status
+        
+        elif enable_text_extraction and file_type not in ['image']:
+            parse_result = self.parser.parse_file(full_path, file_type, enable_ocr=False)
+            if parse_result['success']:
+                extracted_text = parse_result['text']
+                metadata = parse_result.get('metadata', {})
+        
+        # Extract text from images if OCR enabled
+        elif enable_text_extraction and enable_ocr and file_type == 'image':
+            parse_result = self.parser.parse_image_ocr(full_path)
+            if parse_result['success']:
+                extracted_text = parse_result['text']
+                metadata = parse_result.get('metadata', {})
+        
+        # Record the outcome so reads don't retry a failed or empty parse
+        if parse_result is not None:
+            parser_version = self.parser.VERSION
+            if not parse_result['success']:
+                parse_status = 'error'
+            else:
+                parse_status = 'ok' if extracted_text else 'empty'
+        
+        # Wait for the thumbnail before creating the record
+        thumbnail_path = None
+        if thumb_future is not None and thumb_future.result():
+            thumbnail_path = str(thumb_full_path.relative_to(self.storage.base_dir))
+        
+        # Extract metadata fields
+        author = metadata.get('author')
+        creation_date = _parse_creation_date(metadata.get('created'))
+        
+        # Create database record
+        file_record = FileDB.create_file(
+            user_id=user_id,
+            filename=unique_filename,
+            original_filename=original_filename,
+            file_type=file_type,
+            mime_type=mime_type,
+            file_size=file_size,
+            file_path=file_path,
+            description=description,
+            extracted_text=extracted_text,
+            thumbnail_path=thumbnail_path,
+            author=author,
+            creation_date=creation_date,
+            folder_path=folder_path,
+            content_hash=content_hash,
+            parser_version=parser_version,
+            parse_status=parse_status
+        )
+        
+        return {
+            'success': True,
+            'file': {
+                'id': file_record.id,
+                'filename': file_record.filename,
+                'original_filename': file_record.original_filename,
+                'file_type': file_record.file_type,
+                'file_size': file_record.file_size,
+                'file_path': file_record.file_path,
+                'thumbnail_path': file_record.thumbnail_path,
+                'uploaded_at': file_record.uploaded_at.isoformat(),
+                'has_text': bool(extracted_text),
+                'text_preview': extracted_text[:200] if extracted_text else None
+            }
+        }
+    
+    def _generate_thumbnail(
+        self,
+        full_path: Path,
+        file_type: str,
+        content_hash: str,
+        thumb_full_path: Path
+    ) -> bool:
+        """
+        Produce a thumbnail, reusing one already rendered for identical content
+        
+        Thumbnails are rendered once into a content-addressed cache and
+        hard-linked (or copied, where links are unsupported) into the user's
+        thumbnail directory. The shared copy is rendered under a per-thread
+        temporary name and swapped in with os.replace, so concurrent uploads
+        of the same content never link a half-written file.
+        """
+        shared_path = self.storage.get_shared_thumbnail_path(content_hash, file_type)
+        
+        if not shared_path.exists():
+            tmp_path = shared_path.with_name(
+                f".{shared_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            if not self.thumbnail_gen.generate_thumbnail(full_path, file_type, tmp_path):
+                tmp_path.unlink(missing_ok=True)
+                return False
+            os.replace(tmp_path, shared_path)
+        
+        try:
+            os.link(shared_path, thumb_full_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            shutil.copyfile(shared_path, thumb_full_path)
+        return True
+    
+    async def upload_file_async(
+        self,
+        file_data: bytes,
+        original_filename: str,
+        user_id: int,
+        description: Optional[str] = None,
+        folder_path: str = "/",
+        enable_text_extraction: bool = True,
+        enable_thumbnail: bool = True,
+        enable_ocr: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Upload and process a file without blocking the event loop
+        
+        The disk write, parsing, thumbnailing and database insert all run on
+        a worker thread, so many uploads can be in flight at once.
+        
+        Returns:
+            Same dictionary as upload_file
+        """
+        return await asyncio.to_thread(
+            self.upload_file,
+            file_data,
+            original_filename,
+            user_id,
+            description=description,
+            folder_path=folder_path,
+            enable_text_extraction=enable_text_extraction,
+            enable_thumbnail=enable_thumbnail,
+            enable_ocr=enable_ocr
+        )
+    
     def get_file(self, file_id: int, user_id: int) -> Optional[Dict[str, Any]]:
         """Get file information"""
-        file_record = FileDB.get_file(file_id)
+        file_record = FileDB.get_file(file_id, load_text=False)
         
         if not file_record or file_record.user_id != user_id:
             return None
@@ -180,7 +439,7 @@ class FileManager:
             'uploaded_at': file_record.uploaded_at.isoformat(),
             'updated_at': file_record.updated_at.isoformat(),
             'tags': tags,
-            'has_text': bool(file_record.extracted_text)
+            'has_text': file_record.has_text
         }
     
     def download_file(self, file_id: int, user_id: int) -> Optional[Tuple[bytes, str, str]]:
@@ -190,7 +449,7 @@ class FileManager:
         Returns:
             Tuple of (file_data, filename, mime_type) or None
         """
-        file_record = FileDB.get_file(file_id)
+        file_record = FileDB.get_file(file_id, load_text=False)
         
         if not file_record or file_record.user_id != user_id:
             return None
@@ -202,9 +461,30 @@ class FileManager:
         
         return file_data, file_record.original_filename, file_record.mime_type
     
+    def open_download(self, file_id: int, user_id: int) -> Optional[Tuple[BinaryIO, str, str, int]]:
+        """
+        Open a file for streaming download without reading it into memory
+        
+        Returns:
+            Tuple of (binary file object, filename, mime_type, file_size) or None.
+            The caller is responsible for closing the file object.
+        """
+        file_record = FileDB.get_file(file_id, load_text=False)
+        
+        if not file_record or file_record.user_id != user_id:
+            return None
+        
+        opened = self.storage.open_file(file_record.file_path)
+        
+        if not opened:
+            return None
+        
+        file_obj, file_size = opened
+        return file_obj, file_record.original_filename, file_record.mime_type, file_size
+    
     def delete_file(self, file_id: int, user_id: int) -> bool:
         """Delete a file"""
-        file_record = FileDB.get_file(file_id)
+        file_record = FileDB.get_file(file_id, load_text=False)
         
         if not file_record or file_record.user_id != user_id:
             return False
@@ -217,41 +497,33 @@ class FileManager:
             self.storage.delete_file(file_record.thumbnail_path)
         
         # Delete from database (will cascade to tags and conversation_files)
-        return FileDB.delete_file(file_id)
+        deleted = FileDB.delete_file(file_id)
+        
+        # Drop the shared thumbnail once no other file references it
+        if deleted and file_record.content_hash:
+            if FileDB.count_files_with_hash(file_record.content_hash, file_record.file_type) == 0:
+                shared_path = self.storage.get_shared_thumbnail_path(
+                    file_record.content_hash, file_record.file_type
+                )
+                self.storage.delete_file(str(shared_path.relative_to(self.storage.base_dir)))
+        
+        return deleted
     
     def rename_file(self, file_id: int, user_id: int, new_filename: str) -> bool:
         """Rename a file"""
-        file_record = FileDB.get_file(file_id)
-        
-        if not file_record or file_record.user_id != user_id:
-            return False
-        
         # Sanitize new filename
         safe_filename = self.storage.sanitize_filename(new_filename)
         
         # Update in database
-        updated = FileDB.update_file(file_id, filename=safe_filename)
-        return updated is not None
+        return FileDB.update_file_if_owner(file_id, user_id, filename=safe_filename)
     
     def update_file_description(self, file_id: int, user_id: int, description: str) -> bool:
         """Update file description"""
-        file_record = FileDB.get_file(file_id)
-        
-        if not file_record or file_record.user_id != user_id:
-            return False
-        
-        updated = FileDB.update_file(file_id, description=description)
-        return updated is not None
+        return FileDB.update_file_if_owner(file_id, user_id, description=description)
     
     def move_file(self, file_id: int, user_id: int, new_folder_path: str) -> bool:
         """Move file to different folder"""
-        file_record = FileDB.get_file(file_id)
-        
-        if not file_record or file_record.user_id != user_id:
-            return False
-        
-        updated = FileDB.update_file(file_id, folder_path=new_folder_path)
-        return updated is not None
+        return FileDB.update_file_if_owner(file_id, user_id, folder_path=new_folder_path)
     
     def list_files(
         self,
@@ -264,7 +536,7 @@ class FileManager:
         sort_order: str = "desc"
     ) -> List[Dict[str, Any]]:
         """List files with optional filtering"""
-        files = FileDB.list_user_files(
+        files = FileDB.list_user_file_rows(
             user_id=user_id,
             folder_path=folder_path,
             file_type=file_type,
@@ -274,23 +546,9 @@ class FileManager:
             sort_order=sort_order
         )
         
-        result = []
-        for f in files:
-            tags = FileTagDB.get_file_tags(f.id)
-            result.append({
-                'id': f.id,
-                'filename': f.filename,
-                'original_filename': f.original_filename,
-                'file_type': f.file_type,
-                'file_size': f.file_size,
-                'folder_path': f.folder_path,
-                'thumbnail_path': f.thumbnail_path,
-                'uploaded_at': f.uploaded_at.isoformat(),
-                'tags': tags,
-                'description': f.description
-            })
+        tag_map = FileTagDB.get_tags_for_files([f.id for f in files])
         
-        return result
+        return self._listing_dicts(files, tag_map)
     
     def search_files(
         self,
@@ -301,7 +559,7 @@ class FileManager:
         limit: int = 50
     ) -> List[Dict[str, Any]]:
         """Search files"""
-        files = FileDB.search_files(
+        files = FileDB.search_file_rows(
             user_id=user_id,
             search_query=query,
             file_type=file_type,
@@ -309,43 +567,28 @@ class FileManager:
             limit=limit
         )
         
-        result = []
-        for f in files:
-            file_tags = FileTagDB.get_file_tags(f.id)
-            result.append({
-                'id': f.id,
-                'filename': f.filename,
-                'original_filename': f.original_filename,
-                'file_type': f.file_type,
-                'file_size': f.file_size,
-                'folder_path': f.folder_path,
-                'thumbnail_path': f.thumbnail_path,
-                'uploaded_at': f.uploaded_at.isoformat(),
-                'tags': file_tags,
-                'description': f.description
-            })
+        tag_map = FileTagDB.get_tags_for_files([f.id for f in files])
         
+        return self._listing_dicts(files, tag_map)
+    
+    @staticmethod
+    def _listing_dicts(rows: List[Any], tag_map: Dict[int, List[str]]) -> List[Dict[str, Any]]:
+        """Turn LISTING_COLUMNS rows into listing dictionaries"""
+        result = []
+        for row in rows:
+            item = row._asdict()
+            item['uploaded_at'] = row.uploaded_at.isoformat()
+            item['tags'] = tag_map.get(row.id, [])
+            result.append(item)
         return result
     
     def add_tags(self, file_id: int, user_id: int, tags: List[str]) -> bool:
         """Add tags to a file"""
-        file_record = FileDB.get_file(file_id)
-        
-        if not file_record or file_record.user_id != user_id:
-            return False
-        
-        FileTagDB.bulk_add_tags(file_id, tags)
-        return True
+        return FileTagDB.bulk_add_tags_if_owner(file_id, user_id, tags)
     
     def remove_tags(self, file_id: int, user_id: int, tags: List[str]) -> bool:
         """Remove tags from a file"""
-        file_record = FileDB.get_file(file_id)
-        
-        if not file_record or file_record.user_id != user_id:
-            return False
-        
-        FileTagDB.bulk_remove_tags(file_id, tags)
-        return True
+        return FileTagDB.bulk_remove_tags_if_owner(file_id, user_id, tags)
     
     def get_user_tags(self, user_id: int) -> List[Tuple[str, int]]:
         """Get all tags for a user with usage counts"""
@@ -357,12 +600,7 @@ class FileManager:
     
     def get_file_text(self, file_id: int, user_id: int) -> Optional[str]:
         """Get extracted text from a file"""
-        file_record = FileDB.get_file(file_id)
-        
-        if not file_record or file_record.user_id != user_id:
-            return None
-        
-        return file_record.extracted_text
+        return FileDB.get_extracted_text(file_id, user_id)
     
     def attach_to_conversation(
         self,
@@ -373,9 +611,7 @@ class FileManager:
         context_type: Optional[str] = None
     ) -> bool:
         """Attach a file to a conversation"""
-        file_record = FileDB.get_file(file_id)
-        
-        if not file_record or file_record.user_id != user_id:
+        if not FileDB.is_file_owner(file_id, user_id):
             return False
         
         ConversationFileDB.attach_file_to_conversation(
@@ -386,6 +622,23 @@ class FileManager:
         )
         return True
     
+    def bulk_attach_to_conversation(
+        self,
+        file_ids: List[int],
+        conversation_id: int,
+        user_id: int,
+        message_id: Optional[int] = None,
+        context_type: Optional[str] = None
+    ) -> int:
+        """Attach several files to a conversation; returns the number newly attached"""
+        return ConversationFileDB.bulk_attach(
+            conversation_id=conversation_id,
+            file_ids=file_ids,
+            user_id=user_id,
+            message_id=message_id,
+            context_type=context_type
+        )
+    
     def detach_from_conversation(
         self,
         file_id: int,
@@ -393,40 +646,71 @@ class FileManager:
         user_id: int
     ) -> bool:
         """Detach a file from a conversation"""
-        file_record = FileDB.get_file(file_id)
-        
-        if not file_record or file_record.user_id != user_id:
+        if not FileDB.is_file_owner(file_id, user_id):
             return False
         
         return ConversationFileDB.detach_file_from_conversation(conversation_id, file_id)
     
-    def get_conversation_files(self, conversation_id: int, user_id: int) -> List[Dict[str, Any]]:
-        """Get all files attached to a conversation"""
+    def get_conversation_files(
+        self,
+        conversation_id: int,
+        user_id: int,
+        prewarm: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all files attached to a conversation
+        
+        With prewarm=True, text for text-bearing files lacking stored content
+        is extracted in parallel up front so subsequent RAG lookups don't
+        parse serially.
+        """
         files = ConversationFileDB.get_conversation_files(conversation_id)
         
         # Verify user has access to these files
+        files = [f for f in files if f.user_id == user_id]
+        tag_map = FileTagDB.get_tags_for_files([f.id for f in files])
+        
+        if prewarm:
+            FileRAG.warm_contexts(
+                [f.id for f in files if not f.has_text and f.file_type in TEXT_FILE_TYPES],
+                user_id
+            )
+        
         result = []
         for f in files:
-            if f.user_id == user_id:
-                tags = FileTagDB.get_file_tags(f.id)
-                result.append({
-                    'id': f.id,
-                    'filename': f.filename,
-                    'original_filename': f.original_filename,
-                    'file_type': f.file_type,
-                    'file_size': f.file_size,
-                    'thumbnail_path': f.thumbnail_path,
-                    'tags': tags
-                })
+            result.append({
+                'id': f.id,
+                'filename': f.filename,
+                'original_filename': f.original_filename,
+                'file_type': f.file_type,
+                'file_size': f.file_size,
+                'thumbnail_path': f.thumbnail_path,
+                'tags': tag_map.get(f.id, [])
+            })
         
         return result
     
     def bulk_delete_files(self, file_ids: List[int], user_id: int) -> int:
         """Delete multiple files"""
-        count = 0
-        for file_id in file_ids:
-            if self.delete_file(file_id, user_id):
-                count += 1
+        files = FileDB.get_files_bulk(file_ids, user_id)
+        if not files:
+            return 0
+        
+        count = FileDB.delete_files_bulk([f.id for f in files])
+        
+        # Shared thumbnails whose last reference was just deleted
+        hashes = {(f.content_hash, f.file_type) for f in files if f.content_hash}
+        still_used = FileDB.get_referenced_hashes([h for h, _ in hashes])
+        
+        paths = [f.file_path for f in files]
+        paths.extend(f.thumbnail_path for f in files if f.thumbnail_path)
+        for content_hash, file_type in hashes - still_used:
+            shared_path = self.storage.get_shared_thumbnail_path(content_hash, file_type)
+            paths.append(str(shared_path.relative_to(self.storage.base_dir)))
+        
+        # Unlink from disk concurrently
+        list(_postprocess_executor.map(self.storage.delete_file, paths))
+        
         return count
     
     def get_folders(self, user_id: int) -> List[str]:
@@ -1,13 +1,90 @@
 """
 RAG (Retrieval Augmented Generation) for file Q&A and summarization
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import re
+import threading
 
 from backend.database.file_operations import FileDB
 from backend.utils.file_storage import file_storage
 from backend.utils.file_parser import file_parser
 
+# On-the-fly parse results keyed by (path, mtime_ns, file_type), so a file
+# without stored text is parsed at most once per modification
+PARSE_CACHE_SIZE = 256
+_parse_cache: "OrderedDict[Tuple[str, int, str], str]" = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+# Upper bound on concurrent parses when warming several files at once
+WARM_MAX_WORKERS = 8
+
+# File types the parser extracts text from; others (images) aren't warmed
+TEXT_FILE_TYPES = frozenset({'pdf', 'docx', 'txt', 'csv', 'json', 'xml'})
+
+# Marker appended to context cut at max_chars
+TRUNCATION_MARKER = "...\n[Content truncated]"
+
+# Fixed instruction text for the prompt builders; only the document
+# details are interpolated per call
+SUMMARY_INSTRUCTIONS = """Please provide:
+1. A brief overview (2-3 sentences)
+2. Key points or main topics
+3. Any important details or insights
+4. Conclusion or takeaways
+
+Format your response in a clear, structured manner."""
+
+QA_PREAMBLE = "You are an AI assistant helping users understand and analyze documents. You have access to the following document:"
+
+QA_INSTRUCTIONS = "Please answer the question based on the document content. If the information is not in the document, please say so. Be specific and cite relevant parts of the document when possible."
+
+MULTI_FILE_PREAMBLE = """You are an AI assistant helping users analyze multiple documents. You have access to the following documents:
+
+"""
+
+MULTI_FILE_INSTRUCTIONS = "Please answer the question by analyzing all the provided documents. If relevant information is in multiple documents, synthesize the information. Cite which document(s) you're referencing in your answer."
+
+COMPARISON_INSTRUCTIONS = """Please provide a comprehensive comparison including:
+1. Main similarities
+2. Key differences
+3. Unique aspects of each document
+4. Overall assessment
+
+"""
+
+# JSON parser output lists top-level keys as "keys": [...]
+JSON_KEYS_PATTERN = re.compile(r'"keys":\s*\[(.*?)\]')
+
+
+def _parse_cached(full_path: Path, file_type: str) -> Optional[str]:
+    """Parse a file, reusing the text from a previous parse of the same version"""
+    try:
+        mtime_ns = full_path.stat().st_mtime_ns
+    except OSError:
+        return None
+    
+    cache_key = (str(full_path), mtime_ns, file_type)
+    with _parse_cache_lock:
+        text = _parse_cache.get(cache_key)
+        if text is not None:
+            _parse_cache.move_to_end(cache_key)
+            return text
+    
+    parse_result = file_parser.parse_file(full_path, file_type)
+    if not parse_result['success']:
+        return None
+    
+    # Image metadata results carry no 'text' key
+    text = parse_result.get('text') or ''
+    with _parse_cache_lock:
+        _parse_cache[cache_key] = text
+        if len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return text
+
 
 class FileRAG:
     """
@@ -36,21 +113,75 @@ class FileRAG:
         if file_record.extracted_text:
             text = file_record.extracted_text
         else:
+            # The current parser already failed or found nothing in this file
+            if (
+                file_record.parse_status in ('empty', 'error')
+                and file_record.parser_version == file_parser.VERSION
+            ):
+                return None
+            
             # Try to extract on-the-fly
             full_path = file_storage.get_file_path(file_record.file_path)
-            parse_result = file_parser.parse_file(full_path, file_record.file_type)
+            text = _parse_cached(full_path, file_record.file_type)
             
-            if not parse_result['success']:
-                return None
+            # Persist text and outcome so later sessions don't parse again
+            if text is None:
+                parse_status = 'error'
+            else:
+                parse_status = 'ok' if text else 'empty'
+            FileDB.update_file(
+                file_id,
+                extracted_text=text or None,
+                parser_version=file_parser.VERSION,
+                parse_status=parse_status
+            )
             
-            text = parse_result['text']
+            # Match later calls, which skip files recorded as empty
+            if not text:
+                return None
         
-        # Truncate if too long
+        # Truncate if too long; += on the freshly sliced string lets CPython
+        # extend it in place instead of copying it a second time
         if len(text) > max_chars:
-            text = text[:max_chars] + "...\n[Content truncated]"
+            text = text[:max_chars]
+            text += TRUNCATION_MARKER
         
         return text
     
+    @staticmethod
+    def warm_contexts(
+        file_ids: List[int],
+        user_id: int,
+        max_chars: int = 8000
+    ) -> Dict[int, Optional[str]]:
+        """
+        Load context for several files in parallel
+        
+        Files without stored text are parsed concurrently; the results are
+        persisted and cached, so later get_file_context calls are cheap.
+        
+        Args:
+            file_ids: File IDs
+            user_id: User ID (for access control)
+            max_chars: Maximum characters per file
+        
+        Returns:
+            Dictionary mapping file ID to its context text (or None)
+        """
+        if not file_ids:
+            return {}
+        
+        def load_context(file_id: int) -> Optional[str]:
+            # One unreadable file shouldn't fail the whole batch
+            try:
+                return FileRAG.get_file_context(file_id, user_id, max_chars)
+            except Exception as e:
+                print(f"Error warming context for file {file_id}: {e}")
+                return None
+        
+        with ThreadPoolExecutor(max_workers=min(WARM_MAX_WORKERS, len(file_ids))) as executor:
+            return dict(zip(file_ids, executor.map(load_context, file_ids)))
+    
     @staticmethod
     def create_file_summary_prompt(file_info: Dict[str, Any], file_content: str) -> str:
         """
@@ -72,13 +203,7 @@ class FileRAG:
 **Content:**
 {file_content}
 
-Please provide:
-1. A brief overview (2-3 sentences)
-2. Key points or main topics
-3. Any important details or insights
-4. Conclusion or takeaways
-
-Format your response in a clear, structured manner."""
+{SUMMARY_INSTRUCTIONS}"""
 
         return prompt
     
@@ -101,7 +226,7 @@ Format your response in a clear, structured manner."""
         Returns:
             Formatted prompt
         """
-        prompt = f"""You are an AI assistant helping users understand and analyze documents. You have access to the following document:
+        prompt = f"""{QA_PREAMBLE}
 
 **File Name:** {file_info.get('original_filename', 'Unknown')}
 **File Type:** {file_info.get('file_type', 'Unknown')}
@@ -111,18 +236,19 @@ Format your response in a clear, structured manner."""
 
 """
         
+        parts = [prompt]
+        
         # Add conversation history if available
         if conversation_history:
-            prompt += "\n**Previous conversation:**\n"
+            parts.append("\n**Previous conversation:**\n")
             for entry in conversation_history[-3:]:  # Last 3 exchanges
-                prompt += f"Q: {entry.get('question', '')}\n"
-                prompt += f"A: {entry.get('answer', '')}\n\n"
+                parts.append(f"Q: {entry.get('question', '')}\nA: {entry.get('answer', '')}\n\n")
         
-        prompt += f"""**Current Question:** {question}
+        parts.append(f"""**Current Question:** {question}
 
-Please answer the question based on the document content. If the information is not in the document, please say so. Be specific and cite relevant parts of the document when possible."""
+{QA_INSTRUCTIONS}""")
 
-        return prompt
+        return ''.join(parts)
     
     @staticmethod
     def create_multi_file_prompt(
@@ -141,12 +267,10 @@ Please answer the question based on the document content. If the information is
         Returns:
             Formatted prompt
         """
-        prompt = """You are an AI assistant helping users analyze multiple documents. You have access to the following documents:
-
-"""
+        parts = [MULTI_FILE_PREAMBLE]
         
         for i, (info, content) in enumerate(zip(files_info, files_content), 1):
-            prompt += f"""
+            parts.append(f"""
 **Document {i}:**
 - File Name: {info.get('original_filename', 'Unknown')}
 - File Type: {info.get('file_type', 'Unknown')}
@@ -156,14 +280,14 @@ Content:
 
 ---
 
-"""
+""")
         
-        prompt += f"""
+        parts.append(f"""
 **Question:** {question}
 
-Please answer the question by analyzing all the provided documents. If relevant information is in multiple documents, synthesize the information. Cite which document(s) you're referencing in your answer."""
+{MULTI_FILE_INSTRUCTIONS}""")
 
-        return prompt
+        return ''.join(parts)
     
     @staticmethod
     def extract_key_information(file_content: str, file_type: str) -> Dict[str, Any]:
@@ -180,15 +304,14 @@ Please answer the question by analyzing all the provided documents. If relevant
         info = {
             'word_count': len(file_content.split()),
             'char_count': len(file_content),
-            'line_count': len(file_content.split('\n'))
+            'line_count': file_content.count('\n') + 1
         }
         
         # Type-specific extraction
         if file_type == 'csv':
             # Extract column info if visible in content
-            lines = file_content.split('\n')
             if 'Columns:' in file_content:
-                for line in lines:
+                for line in file_content.split('\n'):
                     if line.startswith('Columns:'):
                         info['columns'] = line.replace('Columns:', '').strip()
                     if line.startswith('Total rows:'):
@@ -200,16 +323,18 @@ Please answer the question by analyzing all the provided documents. If relevant
         elif file_type == 'json':
             if 'keys:' in file_content.lower():
                 # Try to find keys in content
-                import re
-                keys_match = re.search(r'"keys":\s*\[(.*?)\]', file_content)
+                keys_match = JSON_KEYS_PATTERN.search(file_content)
                 if keys_match:
                     info['json_keys'] = keys_match.group(1)
         
-        # Extract potential headers/titles (first few lines)
-        lines = file_content.split('\n')
-        non_empty_lines = [l.strip() for l in lines if l.strip()]
-        if non_empty_lines:
-            info['first_line'] = non_empty_lines[0][:200]
+        # Extract potential headers/titles (first non-empty line); leading
+        # whitespace-only lines are skipped by lstrip without splitting
+        # the whole content
+        content = file_content.lstrip()
+        if content:
+            end = content.find('\n')
+            first_line = content if end == -1 else content[:end]
+            info['first_line'] = first_line.strip()[:200]
         
         return info
     
@@ -257,17 +382,9 @@ Content:
 """
         
         if comparison_aspect:
-            prompt += f"Please compare these documents specifically regarding: {comparison_aspect}\n\n"
-        else:
-            prompt += """Please provide a comprehensive comparison including:
-1. Main similarities
-2. Key differences
-3. Unique aspects of each document
-4. Overall assessment
-
-"""
+            return f"{prompt}Please compare these documents specifically regarding: {comparison_aspect}\n\n"
         
-        return prompt
+        return prompt + COMPARISON_INSTRUCTIONS
 
 
 class FileSummarizer:
@@ -281,7 +398,7 @@ class FileSummarizer:
         Returns:
             Dictionary with file info and prompt, ready for LLM
         """
-        file_record = FileDB.get_file(file_id)
+        file_record = FileDB.get_file(file_id, load_text=False)
         
         if not file_record or file_record.user_id != user_id:
             return None
@@ -321,7 +438,7 @@ class FileSummarizer:
         Returns:
             Dictionary with file info and prompt, ready for LLM
         """
-        file_record = FileDB.get_file(file_id)
+        file_record = FileDB.get_file(file_id, load_text=False)
         
         if not file_record or file_record.user_id != user_id:
             return None
@@ -2,16 +2,75 @@
 Enhanced Image Handler - Comprehensive image processing and management
 Supports upload, generation, clipboard, search integration, and vision models
 """
-import base64
+import asyncio
+import glob
 import io
+import logging
+import os
 import hashlib
+import mmap
+import re
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 from PIL import Image
 import mimetypes
 
+logger = logging.getLogger(__name__)
+
+# Base64 coding: pybase64 is a SIMD-accelerated drop-in replacement for the
+# stdlib module on multi-megabyte images; fall back to the stdlib.
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# LRU cache of base64-encoded images keyed by (path, mtime_ns, size), so
+# images embedded repeatedly in chat/gallery renders are encoded once.
+# Bounded by entry count and by total encoded bytes.
+BASE64_CACHE_SIZE = 64
+BASE64_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_base64_cache: "OrderedDict[Tuple[str, int, int], bytes]" = OrderedDict()
+_base64_cache_bytes = 0
+_base64_cache_lock = threading.Lock()
+
+# PIL modes for 8-bit PNGs by IHDR colour type
+PNG_COLOR_MODES = {0: 'L', 2: 'RGB', 3: 'P', 4: 'LA', 6: 'RGBA'}
+
+# PIL modes for JPEGs by SOF component count
+JPEG_COMPONENT_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+# JPEG start-of-frame markers (SOF0-SOF15, excluding DHT, JPG and DAC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Stems of cached thumbnails: '<stem>_thumb' at the default size and
+# '<stem>_thumb_<w>x<h>' at any other
+THUMBNAIL_STEM_PATTERN = re.compile(r'_thumb(?:_\d+x\d+)?$')
+
+# Chunk size for streaming image downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Shared HTTP session so repeated downloads from the same host reuse
+# pooled keep-alive connections instead of a new TCP+TLS handshake each
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+_session.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; ImageBot/1.0)'})
+
 class ImageHandler:
     """Comprehensive image handling system"""
     
@@ -25,18 +84,134 @@ class ImageHandler:
     GENERATED_DIR = Path("uploads/generated_images")
     SEARCH_CACHE_DIR = Path("uploads/search_images")
     
+    # Content-addressed store backing saved images; the files above are
+    # hard links into it, so identical images share one copy on disk
+    BLOB_DIR = Path("uploads/image_blobs")
+    
     # Maximum image sizes
     MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 MB
     MAX_DIMENSION = 4096  # pixels
+    THUMBNAIL_SIZE = (200, 200)
+    THUMBNAIL_QUALITY = 80  # WEBP quality for cached thumbnails
+    
+    # Limits pre-formatted for error messages
+    _MAX_UPLOAD_MB_STR = f"{MAX_UPLOAD_SIZE / (1024 * 1024)}"
     
     def __init__(self):
         """Initialize image handler"""
+        # Directories already created, so saves can skip mkdir
+        self._known_dirs: set = set()
+        
+        # Resolved absolute form of each directory, so returned file paths
+        # don't need a realpath walk per file
+        self._absolute_dirs: Dict[Path, Path] = {}
+        
         # Create directories
-        for dir_path in [self.UPLOAD_DIR, self.GENERATED_DIR, self.SEARCH_CACHE_DIR]:
-            dir_path.mkdir(parents=True, exist_ok=True)
+        for dir_path in [self.UPLOAD_DIR, self.GENERATED_DIR, self.SEARCH_CACHE_DIR, self.BLOB_DIR]:
+            self._ensure_directory(dir_path)
+    
+    def _absolute_directory(self, path: Path) -> Path:
+        """Get a directory's resolved absolute path, resolving it once"""
+        absolute = self._absolute_dirs.get(path)
+        if absolute is None:
+            absolute = self._absolute_dirs[path] = path.resolve()
+        return absolute
+    
+    def _ensure_directory(self, path: Path) -> Path:
+        """Create a directory once per instance"""
+        if path not in self._known_dirs:
+            path.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(path)
+        return path
+    
+    @staticmethod
+    def _write_file(path: Path, data) -> None:
+        """
+        Write a complete in-memory payload to disk
+        
+        Uses unbuffered os.write on a preallocated file rather than a
+        buffered file object, since the whole payload is already contiguous.
+        """
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if data and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, 0, len(data))
+                except OSError:
+                    pass  # Filesystem doesn't support preallocation
+            
+            view = memoryview(data)
+            written = 0
+            while written < len(view):
+                written += os.write(fd, view[written:])
+        finally:
+            os.close(fd)
+    
+    @staticmethod
+    def _temp_path(path: Path) -> Path:
+        """Get a per-thread temporary name next to path"""
+        return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    
+    def _blob_path(self, content_hash: str, ext: str) -> Path:
+        """Get the content-addressed blob path for an image"""
+        return self.BLOB_DIR / content_hash[:2] / f"{content_hash}{ext}"
+    
+    def _store_image(self, save_path: Path, file_data, content_hash: str) -> None:
+        """
+        Store an image as a hard link to its content-addressed blob
+        
+        Identical images share one blob, so saving a duplicate costs a stat
+        and a link. Files are swapped into place with os.replace so an
+        existing linked file is never truncated. Falls back to writing a
+        separate copy where hard links aren't supported.
+        """
+        blob_path = self._blob_path(content_hash, save_path.suffix)
+        tmp_path = self._temp_path(save_path)
+        try:
+            if not blob_path.exists():
+                self._ensure_directory(blob_path.parent)
+                blob_tmp_path = self._temp_path(blob_path)
+                self._write_file(blob_tmp_path, file_data)
+                os.replace(blob_tmp_path, blob_path)
+            os.link(blob_path, tmp_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            self._write_file(tmp_path, file_data)
+        os.replace(tmp_path, save_path)
+        # rename is a no-op when both names already link the same blob
+        tmp_path.unlink(missing_ok=True)
+    
+    def _release_blob(self, path: Path) -> Optional[Path]:
+        """
+        Find the blob behind an image that is about to be deleted, if the
+        image is its only other link
+        """
+        try:
+            if path.stat().st_nlink != 2:
+                return None
+            with open(path, 'rb') as f:
+                content_hash = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        except OSError:
+            return None
+        
+        blob_path = self._blob_path(content_hash, path.suffix)
+        try:
+            if os.path.samefile(blob_path, path):
+                return blob_path
+        except OSError:
+            pass
+        return None
     
     @staticmethod
-    def validate_image(file_data: bytes, filename: str = None) -> Tuple[bool, Optional[str]]:
+    def _size_error(size_bytes: int) -> str:
+        """Format the error for an image over MAX_UPLOAD_SIZE"""
+        return f"Image size ({size_bytes / 1048576:.1f}MB) exceeds maximum ({ImageHandler._MAX_UPLOAD_MB_STR}MB)"
+    
+    @staticmethod
+    def validate_image(
+        file_data: bytes,
+        filename: str = None
+    ) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
         """
         Validate image file
         
@@ -45,30 +220,151 @@ class ImageHandler:
             filename: Optional filename for format detection
             
         Returns:
-            Tuple of (is_valid, error_message)
+            Tuple of (is_valid, error_message, info) where info holds the
+            format, size and mode read while validating
         """
         # Check size
-        if len(file_data) > ImageHandler.MAX_UPLOAD_SIZE:
-            size_mb = len(file_data) / (1024 * 1024)
-            max_mb = ImageHandler.MAX_UPLOAD_SIZE / (1024 * 1024)
-            return False, f"Image size ({size_mb:.1f}MB) exceeds maximum ({max_mb}MB)"
+        size_bytes = len(file_data)
+        if size_bytes > ImageHandler.MAX_UPLOAD_SIZE:
+            return False, ImageHandler._size_error(size_bytes), None
         
-        # Try to open with PIL
+        # Read the header directly, falling back to PIL for other formats
         try:
-            img = Image.open(io.BytesIO(file_data))
+            info = ImageHandler._parse_header(file_data)
+            if info is None:
+                img = Image.open(io.BytesIO(file_data))
+                info = {'format': img.format, 'size': img.size, 'mode': img.mode}
             
             # Check format
-            if img.format.lower() not in ImageHandler.SUPPORTED_FORMATS:
-                return False, f"Unsupported image format: {img.format}"
+            if info['format'].lower() not in ImageHandler.SUPPORTED_FORMATS:
+                return False, f"Unsupported image format: {info['format']}", None
             
             # Check dimensions
-            if max(img.size) > ImageHandler.MAX_DIMENSION:
-                return False, f"Image dimension ({max(img.size)}px) exceeds maximum ({ImageHandler.MAX_DIMENSION}px)"
+            max_dimension = ImageHandler.MAX_DIMENSION
+            largest = max(info['size'])
+            if largest > max_dimension:
+                return False, f"Image dimension ({largest}px) exceeds maximum ({max_dimension}px)", None
             
-            return True, None
+            return True, None, info
             
         except Exception as e:
-            return False, f"Invalid image file: {str(e)}"
+            return False, f"Invalid image file: {str(e)}", None
+    
+    @staticmethod
+    def _parse_header(file_data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Read format, size and mode from a PNG or JPEG header without PIL
+        
+        Only the metadata ahead of the pixel data is read; nothing is
+        decoded.
+        
+        Args:
+            file_data: Image file bytes
+            
+        Returns:
+            Info dictionary as returned by validate_image, or None when the
+            header isn't one handled here (the caller then uses PIL)
+        """
+        # PNG: signature and IHDR, then chunks up to the first IDAT with
+        # their CRCs checked, as PIL does when opening
+        if file_data[:8] == b'\x89PNG\r\n\x1a\n':
+            if file_data[8:16] != b'\x00\x00\x00\rIHDR':
+                return None
+            info = None
+            pos = 8
+            end = len(file_data)
+            while pos + 12 <= end:
+                length, chunk_type = struct.unpack_from('>I4s', file_data, pos)
+                if chunk_type == b'IDAT':
+                    return info
+                if pos + 12 + length > end:
+                    return None
+                crc = struct.unpack_from('>I', file_data, pos + 8 + length)[0]
+                if zlib.crc32(file_data[pos + 4:pos + 8 + length]) != crc:
+                    return None
+                if chunk_type == b'IHDR':
+                    width, height, bit_depth, color_type = struct.unpack_from('>IIBB', file_data, pos + 8)
+                    mode = PNG_COLOR_MODES.get(color_type)
+                    if bit_depth != 8 or mode is None or not width or not height:
+                        return None
+                    info = {'format': 'PNG', 'size': (width, height), 'mode': mode}
+                pos += 12 + length
+            return None
+        
+        # JPEG: walk marker segments through the frame header to the scan
+        if file_data[:3] == b'\xff\xd8\xff':
+            info = None
+            pos = 2
+            end = len(file_data)
+            while pos + 4 <= end:
+                if file_data[pos] != 0xFF:
+                    return None
+                marker = file_data[pos + 1]
+                if marker == 0xFF:
+                    pos += 1  # Fill byte
+                    continue
+                if 0xD0 <= marker <= 0xD7:
+                    pos += 2  # Restart marker without a length
+                    continue
+                if marker < 0xC0 or marker in (0xD8, 0xD9):
+                    return None
+                
+                length = (file_data[pos + 2] << 8) | file_data[pos + 3]
+                if length < 2 or pos + 2 + length > end:
+                    return None
+                if marker == 0xDA:
+                    return info
+                # PIL reports JPEGs carrying an MPF segment as MPO
+                if marker == 0xE2 and file_data[pos + 4:pos + 8] == b'MPF\x00':
+                    return None
+                if marker in JPEG_SOF_MARKERS:
+                    if length < 8 or info is not None:
+                        return None
+                    height, width, components = struct.unpack_from('>HHB', file_data, pos + 5)
+                    mode = JPEG_COMPONENT_MODES.get(components)
+                    if mode is None or not width or not height:
+                        return None
+                    info = {'format': 'JPEG', 'size': (width, height), 'mode': mode}
+                pos += 2 + length
+        
+        return None
+    
+    @staticmethod
+    def _select_resample(
+        src_size: Tuple[int, int],
+        dst_size: Tuple[int, int]
+    ) -> Image.Resampling:
+        """
+        Pick a resampling filter for a downscale
+        
+        Large reductions look the same with the cheap area-averaging
+        filters, so LANCZOS is only used for mild downscales.
+        """
+        scale = min(dst_size[0] / src_size[0], dst_size[1] / src_size[1])
+        if scale < 0.25:
+            return Image.Resampling.BOX
+        if scale < 0.5:
+            return Image.Resampling.HAMMING
+        return Image.Resampling.LANCZOS
+    
+    @staticmethod
+    def _flatten_alpha(img: Image.Image) -> Image.Image:
+        """
+        Composite an RGBA or LA image onto a white background
+        
+        Done as one vectorized numpy blend instead of new + split + paste,
+        which allocates a separate image per channel. Rounds like PIL's
+        paste so the output is identical.
+        """
+        arr = np.asarray(img)
+        alpha = arr[..., -1:].astype(np.uint16)
+        if img.mode == 'LA':
+            rgb = np.repeat(arr[..., :1], 3, axis=-1).astype(np.uint16)
+        else:
+            rgb = arr[..., :3].astype(np.uint16)
+        
+        out = (rgb * alpha + 255 * (255 - alpha) + 127) // 255
+        return Image.fromarray(out.astype(np.uint8), 'RGB')
     
     @staticmethod
     def process_image(
@@ -91,17 +387,15 @@ class ImageHandler:
         """
         img = Image.open(io.BytesIO(file_data))
         
-        # Convert RGBA to RGB for JPEG
+        # Convert RGBA to RGB for JPEG, compositing onto white
         if format.upper() == 'JPEG' and img.mode in ('RGBA', 'LA', 'P'):
-            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
             if img.mode == 'P':
                 img = img.convert('RGBA')
-            rgb_img.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = rgb_img
+            img = ImageHandler._flatten_alpha(img)
         
         # Resize if needed
         if max_size:
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+            img.thumbnail(max_size, ImageHandler._select_resample(img.size, max_size))
         
         # Save to bytes
         output = io.BytesIO()
@@ -133,13 +427,14 @@ class ImageHandler:
         """
         try:
             # Validate image
-            is_valid, error = self.validate_image(file_data, filename)
+            is_valid, error, info = self.validate_image(file_data, filename)
             if not is_valid:
                 return {'success': False, 'error': error}
             
             # Generate unique filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_hash = hashlib.md5(file_data).hexdigest()[:8]
+            content_hash = hashlib.blake2b(file_data, digest_size=16).hexdigest()
+            file_hash = content_hash[:8]
             ext = Path(filename).suffix or '.png'
             safe_name = Path(filename).stem[:50]
             
@@ -149,16 +444,15 @@ class ImageHandler:
             save_path = self.UPLOAD_DIR / unique_filename
             
             # Ensure parent directory exists
-            save_path.parent.mkdir(parents=True, exist_ok=True)
+            self._ensure_directory(save_path.parent)
             
-            with open(save_path, 'wb') as f:
-                f.write(file_data)
+            self._store_image(save_path, file_data, content_hash)
             
-            # Get image info
-            img = Image.open(io.BytesIO(file_data))
+            # Generate the thumbnail now, while the bytes are in memory
+            thumb_path = self._write_thumbnail(io.BytesIO(file_data), save_path)
             
             # Get absolute and relative paths
-            abs_path = save_path.resolve()
+            abs_path = self._absolute_directory(save_path.parent) / unique_filename
             rel_path = str(save_path)  # Already relative, just convert to string
             
             return {
@@ -169,9 +463,10 @@ class ImageHandler:
                 'original_filename': filename,
                 'size_bytes': len(file_data),
                 'size_kb': round(len(file_data) / 1024, 2),
-                'format': img.format,
-                'dimensions': img.size,
-                'mode': img.mode,
+                'format': info['format'],
+                'dimensions': info['size'],
+                'mode': info['mode'],
+                'thumbnail_path': thumb_path,
                 'created_at': datetime.now().isoformat(),
                 'metadata': metadata or {}
             }
@@ -179,6 +474,29 @@ class ImageHandler:
         except Exception as e:
             return {'success': False, 'error': f"Failed to save image: {str(e)}"}
     
+    async def save_uploaded_image_async(
+        self,
+        file_data: bytes,
+        filename: str,
+        user_id: int,
+        metadata: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """
+        Save uploaded image without blocking the event loop
+        
+        Validation, the disk write and thumbnailing run on a worker thread.
+        
+        Returns:
+            Same dictionary as save_uploaded_image
+        """
+        return await asyncio.to_thread(
+            self.save_uploaded_image,
+            file_data,
+            filename,
+            user_id,
+            metadata=metadata
+        )
+    
     def save_from_clipboard(
         self,
         clipboard_data: str,
@@ -233,12 +551,22 @@ class ImageHandler:
         """
         try:
             # Download image
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (compatible; ImageBot/1.0)'
-            })
-            response.raise_for_status()
-            
-            file_data = response.content
+            with _session.get(url, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                
+                # Reject oversized bodies before buffering them
+                content_length = int(response.headers.get('Content-Length') or 0)
+                if content_length > self.MAX_UPLOAD_SIZE:
+                    return {'success': False, 'error': self._size_error(content_length)}
+                
+                # Hash while downloading so the body isn't read twice
+                hasher = hashlib.blake2b(digest_size=16)
+                file_data = bytearray()
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    file_data += chunk
+                    if len(file_data) > self.MAX_UPLOAD_SIZE:
+                        return {'success': False, 'error': self._size_error(len(file_data))}
+                    hasher.update(chunk)
             
             # Get filename from URL or generate one
             url_path = Path(url.split('?')[0])  # Remove query params
@@ -251,13 +579,14 @@ class ImageHandler:
                 save_dir = self.UPLOAD_DIR
             
             # Validate image
-            is_valid, error = self.validate_image(file_data, filename)
+            is_valid, error, info = self.validate_image(file_data, filename)
             if not is_valid:
                 return {'success': False, 'error': error}
             
             # Generate unique filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_hash = hashlib.md5(file_data).hexdigest()[:8]
+            content_hash = hasher.hexdigest()
+            file_hash = content_hash[:8]
             ext = Path(filename).suffix or '.png'
             
             unique_filename = f"{user_id}_{timestamp}_{file_hash}{ext}"
@@ -266,16 +595,15 @@ class ImageHandler:
             save_path = save_dir / unique_filename
             
             # Ensure parent directory exists
-            save_path.parent.mkdir(parents=True, exist_ok=True)
+            self._ensure_directory(save_path.parent)
             
-            with open(save_path, 'wb') as f:
-                f.write(file_data)
+            self._store_image(save_path, file_data, content_hash)
             
-            # Get image info
-            img = Image.open(io.BytesIO(file_data))
+            # Generate the thumbnail now, while the bytes are in memory
+            thumb_path = self._write_thumbnail(io.BytesIO(file_data), save_path)
             
             # Get absolute and relative paths
-            abs_path = save_path.resolve()
+            abs_path = self._absolute_directory(save_path.parent) / unique_filename
             rel_path = str(save_path)  # Already relative, just convert to string
             
             return {
@@ -286,8 +614,9 @@ class ImageHandler:
                 'original_url': url,
                 'size_bytes': len(file_data),
                 'size_kb': round(len(file_data) / 1024, 2),
-                'format': img.format,
-                'dimensions': img.size,
+                'format': info['format'],
+                'dimensions': info['size'],
+                'thumbnail_path': thumb_path,
                 'created_at': datetime.now().isoformat(),
                 'source': source
             }
@@ -297,36 +626,164 @@ class ImageHandler:
         except Exception as e:
             return {'success': False, 'error': f"Failed to save image: {str(e)}"}
     
-    def create_thumbnail(
+    async def save_from_url_async(
         self,
-        image_path: str,
-        size: Tuple[int, int] = (200, 200)
+        url: str,
+        user_id: int,
+        source: str = 'web'
+    ) -> Dict[str, Any]:
+        """
+        Download and save image from URL without blocking the event loop
+        
+        Returns:
+            Same dictionary as save_from_url
+        """
+        return await asyncio.to_thread(self.save_from_url, url, user_id, source)
+    
+    def save_from_urls(
+        self,
+        urls: List[str],
+        user_id: int,
+        source: str = 'web',
+        max_workers: int = 8
+    ) -> List[Dict[str, Any]]:
+        """
+        Download and save several images concurrently
+        
+        Args:
+            urls: Image URLs
+            user_id: User ID
+            source: Source identifier (e.g., 'search', 'web')
+            max_workers: Maximum concurrent downloads
+            
+        Returns:
+            List of image info dictionaries, in the same order as urls
+        """
+        if not urls:
+            return []
+        
+        workers = min(max_workers, len(urls))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda url: self.save_from_url(url, user_id, source),
+                urls
+            ))
+    
+    @classmethod
+    def _thumbnail_path(cls, image_path: Path, size: Tuple[int, int] = THUMBNAIL_SIZE) -> Path:
+        """Get the cached thumbnail path for an image at a given size"""
+        if tuple(size) == cls.THUMBNAIL_SIZE:
+            return image_path.parent / f"{image_path.stem}_thumb.webp"
+        width, height = size
+        return image_path.parent / f"{image_path.stem}_thumb_{width}x{height}.webp"
+    
+    def _write_thumbnail(
+        self,
+        source,
+        image_path: Path,
+        size: Tuple[int, int] = THUMBNAIL_SIZE
     ) -> Optional[str]:
         """
-        Create thumbnail for an image
+        Render and save the thumbnail for an image
         
         Args:
-            image_path: Path to original image
+            source: Path or file object to read the original from
+            image_path: Path of the original image
             size: Thumbnail size (width, height)
             
         Returns:
             Path to thumbnail or None on failure
         """
         try:
-            img = Image.open(image_path)
-            img.thumbnail(size, Image.Resampling.LANCZOS)
-            
-            # Save thumbnail
-            path = Path(image_path)
-            thumb_path = path.parent / f"{path.stem}_thumb{path.suffix}"
-            img.save(thumb_path)
+            with Image.open(source) as img:
+                img.thumbnail(size, self._select_resample(img.size, size))
+                
+                thumb_path = self._thumbnail_path(image_path, size)
+                img.save(thumb_path, format='WEBP', quality=self.THUMBNAIL_QUALITY)
             
             return str(thumb_path)
             
         except Exception as e:
-            print(f"Failed to create thumbnail: {e}")
+            logger.warning("Failed to create thumbnail: %s", e)
             return None
     
+    def create_thumbnail(
+        self,
+        image_path: str,
+        size: Tuple[int, int] = THUMBNAIL_SIZE
+    ) -> Optional[str]:
+        """
+        Create thumbnail for an image, reusing the cached one for this size
+        if it is newer than the original
+        
+        Args:
+            image_path: Path to original image
+            size: Thumbnail size (width, height)
+            
+        Returns:
+            Path to thumbnail or None on failure
+        """
+        path = Path(image_path)
+        thumb_path = self._thumbnail_path(path, size)
+        
+        try:
+            if thumb_path.stat().st_mtime >= path.stat().st_mtime:
+                return str(thumb_path)
+        except OSError:
+            pass
+        
+        return self._write_thumbnail(path, path, size)
+    
+    async def create_thumbnail_async(
+        self,
+        image_path: str,
+        size: Tuple[int, int] = THUMBNAIL_SIZE
+    ) -> Optional[str]:
+        """
+        Create thumbnail for an image without blocking the event loop
+        
+        Returns:
+            Same as create_thumbnail
+        """
+        return await asyncio.to_thread(self.create_thumbnail, image_path, size)
+    
+    @staticmethod
+    def _encode_file(image_path: str) -> bytes:
+        """Read an image and return its base64 encoding as bytes, reusing a
+        previous encoding while the file is unchanged"""
+        global _base64_cache_bytes
+        
+        stat = os.stat(image_path)
+        cache_key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+        with _base64_cache_lock:
+            encoded = _base64_cache.get(cache_key)
+            if encoded is not None:
+                _base64_cache.move_to_end(cache_key)
+                return encoded
+        
+        # Encode straight from a read-only mapping of the file rather than
+        # reading it into a bytes copy first
+        with open(image_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+                    encoded = base64.b64encode(mapped)
+            else:
+                encoded = b''
+        
+        if len(encoded) > BASE64_CACHE_MAX_BYTES:
+            return encoded
+        
+        with _base64_cache_lock:
+            if cache_key not in _base64_cache:
+                _base64_cache[cache_key] = encoded
+                _base64_cache_bytes += len(encoded)
+                while (len(_base64_cache) > BASE64_CACHE_SIZE
+                       or _base64_cache_bytes > BASE64_CACHE_MAX_BYTES):
+                    _, evicted = _base64_cache.popitem(last=False)
+                    _base64_cache_bytes -= len(evicted)
+        return encoded
+    
     def get_image_base64(self, image_path: str) -> Optional[str]:
         """
         Get base64 encoded image for embedding
@@ -338,12 +795,20 @@ class ImageHandler:
             Base64 encoded string or None
         """
         try:
-            with open(image_path, 'rb') as f:
-                return base64.b64encode(f.read()).decode('utf-8')
+            return self._encode_file(image_path).decode('ascii')
         except Exception as e:
-            print(f"Failed to encode image: {e}")
+            logger.warning("Failed to encode image: %s", e)
             return None
     
+    async def get_image_base64_async(self, image_path: str) -> Optional[str]:
+        """
+        Get base64 encoded image without blocking the event loop
+        
+        Returns:
+            Same as get_image_base64
+        """
+        return await asyncio.to_thread(self.get_image_base64, image_path)
+    
     def get_image_data_url(self, image_path: str) -> Optional[str]:
         """
         Get data URL for image (for embedding in HTML/markdown)
@@ -356,19 +821,29 @@ class ImageHandler:
         """
         try:
             mime_type = mimetypes.guess_type(image_path)[0] or 'image/png'
-            base64_data = self.get_image_base64(image_path)
-            if base64_data:
-                return f"data:{mime_type};base64,{base64_data}"
-            return None
+            try:
+                encoded = self._encode_file(image_path)
+            except Exception as e:
+                logger.warning("Failed to encode image: %s", e)
+                return None
+            if not encoded:
+                return None
+            
+            # Join as bytes and decode once, rather than building the
+            # base64 str and then copying it again into the URL
+            return b''.join((
+                b'data:', mime_type.encode('ascii'), b';base64,', encoded
+            )).decode('ascii')
         except Exception as e:
-            print(f"Failed to create data URL: {e}")
+            logger.warning("Failed to create data URL: %s", e)
             return None
     
     def list_user_images(
         self,
         user_id: int,
         source: str = 'all',
-        limit: int = 50
+        limit: int = 50,
+        include_dimensions: bool = False
     ) -> List[Dict[str, Any]]:
         """
         List images for a user
@@ -377,6 +852,8 @@ class ImageHandler:
             user_id: User ID
             source: Filter by source ('all', 'upload', 'generated', 'search')
             limit: Maximum number of images to return
+            include_dimensions: Open each image to read its format and
+                dimensions (otherwise both are None)
             
         Returns:
             List of image info dictionaries
@@ -396,35 +873,50 @@ class ImageHandler:
             return []
         
         # Search for user's images
+        prefix = f"{user_id}_"
         for search_dir in search_dirs:
-            if not search_dir.exists():
+            if len(images) >= limit:
+                break
+            
+            try:
+                with os.scandir(search_dir) as it:
+                    entries = [
+                        (entry, entry.stat())
+                        for entry in it
+                        if entry.name.startswith(prefix)
+                        and not THUMBNAIL_STEM_PATTERN.search(entry.name.rsplit('.', 1)[0])
+                    ]
+            except OSError:
                 continue
-                
-            pattern = f"{user_id}_*"
-            for img_path in sorted(search_dir.glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True):
-                if len(images) >= limit:
-                    break
-                
+            
+            entries.sort(key=lambda item: item[1].st_mtime, reverse=True)
+            abs_dir = self._absolute_directory(search_dir)
+            
+            for entry, stat in entries[:limit - len(images)]:
                 try:
-                    stat = img_path.stat()
-                    img = Image.open(img_path)
+                    img_format = None
+                    dimensions = None
+                    if include_dimensions:
+                        with Image.open(entry.path) as img:
+                            img_format = img.format
+                            dimensions = img.size
                     
                     # Get absolute path
-                    abs_path = img_path.resolve()
+                    abs_path = abs_dir / entry.name
                     
                     images.append({
                         'file_path': str(abs_path),
-                        'relative_path': str(img_path),  # Keep original relative path
-                        'filename': img_path.name,
+                        'relative_path': entry.path,  # Keep original relative path
+                        'filename': entry.name,
                         'size_bytes': stat.st_size,
                         'size_kb': round(stat.st_size / 1024, 2),
-                        'format': img.format,
-                        'dimensions': img.size,
+                        'format': img_format,
+                        'dimensions': dimensions,
                         'created_at': datetime.fromtimestamp(stat.st_ctime).isoformat(),
                         'modified_at': datetime.fromtimestamp(stat.st_mtime).isoformat()
                     })
                 except Exception as e:
-                    print(f"Error reading image {img_path}: {e}")
+                    logger.warning("Error reading image %s: %s", entry.path, e)
                     continue
         
         return images
@@ -442,17 +934,32 @@ class ImageHandler:
         try:
             path = Path(image_path)
             if path.exists():
+                blob_path = self._release_blob(path)
                 path.unlink()
                 
-                # Also delete thumbnail if exists
-                thumb_path = path.parent / f"{path.stem}_thumb{path.suffix}"
-                if thumb_path.exists():
-                    thumb_path.unlink()
+                # Drop the shared blob once nothing links to it
+                if blob_path is not None and blob_path.stat().st_nlink == 1:
+                    blob_path.unlink()
+                
+                # Also delete thumbnails if they exist (every size, plus the
+                # legacy naming)
+                thumb_paths = [
+                    self._thumbnail_path(path),
+                    path.parent / f"{path.stem}_thumb{path.suffix}"
+                ]
+                thumb_paths.extend(
+                    thumb_path
+                    for thumb_path in path.parent.glob(f"{glob.escape(path.stem)}_thumb_*.webp")
+                    if THUMBNAIL_STEM_PATTERN.fullmatch(thumb_path.stem, len(path.stem))
+                )
+                for thumb_path in thumb_paths:
+                    if thumb_path.exists():
+                        thumb_path.unlink()
                 
                 return True
             return False
         except Exception as e:
-            print(f"Failed to delete image: {e}")
+            logger.warning("Failed to delete image: %s", e)
             return False
 
 
@@ -2,15 +2,89 @@
 Memory Extractor - Intelligent extraction of important information from conversations
 Uses LLM to identify and extract memorable facts, preferences, and context
 """
+import hashlib
 import json
 import re
-from typing import List, Dict, Optional, Tuple
+import threading
+from collections import OrderedDict, defaultdict
+from operator import itemgetter
+from typing import Any, Iterator, List, Dict, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+
 from backend.database.memory_models import Memory
 from backend.core.memory_manager import MemoryManager
 from backend.providers.base import BaseLLMProvider
 
+# JSON parsing: orjson is several times faster than the stdlib decoder on
+# LLM responses; fall back to json. orjson.JSONDecodeError subclasses
+# json.JSONDecodeError, so the handlers below catch either.
+try:
+    import orjson
+    
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# LRU cache of LLM extraction results keyed by (user_id, conversation
+# hash), so retried or repeated conversations skip the LLM call
+EXTRACTION_CACHE_SIZE = 256
+_extraction_cache: "OrderedDict[Tuple[int, str], List[Dict[str, Any]]]" = OrderedDict()
+
+_extraction_cache_lock = threading.Lock()
+
+# Sort key for (importance_score, memory) pairs when formatting memories
+_by_importance = itemgetter(0)
+
+# Similar-memory search used to detect conflicts with existing memories
+CONFLICT_SEARCH_LIMIT = 5
+CONFLICT_MIN_SIMILARITY = 0.7
+
+# Characters that matter when scanning for a balanced JSON array
+JSON_ARRAY_TOKEN_PATTERN = re.compile(r'[\[\]"\\]')
+
+
+def _iter_json_arrays(text: str) -> Iterator[str]:
+    """
+    Yield each balanced top-level [...] span in text, in order; nested
+    arrays are never yielded on their own
+    
+    Brackets inside JSON strings (including escaped quotes) are ignored.
+    The scan jumps between bracket, quote and backslash characters rather
+    than stepping through every character.
+    """
+    start = text.find('[')
+    while start != -1:
+        depth = 0
+        in_string = False
+        escaped_until = -1
+        end = -1
+        for match in JSON_ARRAY_TOKEN_PATTERN.finditer(text, start):
+            pos = match.start()
+            if pos < escaped_until:
+                continue
+            char = match.group()
+            if in_string:
+                if char == '\\':
+                    escaped_until = pos + 2
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == '[':
+                depth += 1
+            elif char == ']':
+                depth -= 1
+                if depth == 0:
+                    end = pos + 1
+                    break
+        
+        if end == -1:
+            return  # Unbalanced from here on
+        yield text[start:end]
+        start = text.find('[', end)
+
 
 class MemoryExtractor:
     """
@@ -152,34 +226,69 @@ Respond in JSON format:
             # Format conversation for prompt
             conv_text = self._format_conversation(conversation)
             
-            # Build extraction prompt
-            prompt = self.EXTRACTION_PROMPT.format(conversation=conv_text)
-            
-            # Call LLM to extract memories
-            response = self.llm_provider.generate(
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,  # Lower temperature for more consistent extraction
-                max_tokens=2000
-            )
+            # Reuse the extraction of an identical conversation
+            cache_key = (user_id, hashlib.blake2b(conv_text.encode('utf-8'), digest_size=16).hexdigest())
+            extracted_data = self._lookup_extraction(cache_key)
             
-            # Parse JSON response
-            extracted_data = self._parse_extraction_response(response)
+            if extracted_data is None:
+                # Build extraction prompt
+                prompt = self.EXTRACTION_PROMPT.format(conversation=conv_text)
+                
+                # Call LLM to extract memories
+                response = self.llm_provider.generate(
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.3,  # Lower temperature for more consistent extraction
+                    max_tokens=2000
+                )
+                
+                # Parse JSON response, skipping anything that isn't a memory object
+                extracted_data = self._parse_extraction_response(response)
+                if isinstance(extracted_data, list):
+                    extracted_data = [mem_data for mem_data in extracted_data if isinstance(mem_data, dict)]
+                else:
+                    extracted_data = []
+                
+                # Empty results aren't cached: they include parse failures,
+                # which a retry should send to the LLM again
+                if extracted_data:
+                    self._store_extraction(cache_key, extracted_data)
             
-            if not extracted_data:
+            if not extracted_data or not auto_save:
                 return []
             
+            # Embed every candidate and look up similar existing memories
+            # for all of them in one batch
+            contents = [mem_data.get('content', '') for mem_data in extracted_data]
+            embeddings = self.memory_manager.embedder.batch_generate_embeddings(contents)
+            similar_batch = self.memory_manager.batch_search_memories(
+                user_id=user_id,
+                queries=contents,
+                memory_types=[[mem_data.get('memory_type', 'fact')] for mem_data in extracted_data],
+                limit=CONFLICT_SEARCH_LIMIT,
+                min_similarity=CONFLICT_MIN_SIMILARITY,  # High threshold for conflict detection
+                query_embeddings=embeddings
+            )
+            
             # Create memories
             created_memories = []
-            for mem_data in extracted_data:
-                if auto_save:
-                    # Check for conflicts before saving
-                    memory = self._create_memory_with_conflict_check(
-                        user_id=user_id,
-                        mem_data=mem_data,
-                        conversation_id=conversation_id
+            batch_memories = []
+            for mem_data, embedding, similar_memories in zip(extracted_data, embeddings, similar_batch):
+                # Check for conflicts before saving
+                memory = self._create_memory_with_conflict_check(
+                    user_id=user_id,
+                    mem_data=mem_data,
+                    conversation_id=conversation_id,
+                    similar_memories=self._merge_batch_matches(
+                        similar_memories,
+                        mem_data.get('memory_type', 'fact'),
+                        embedding,
+                        batch_memories
                     )
-                    if memory:
-                        created_memories.append(memory)
+                )
+                if memory:
+                    created_memories.append(memory)
+                    if embedding:
+                        batch_memories.append((memory, embedding))
             
             return created_memories
         
@@ -187,29 +296,65 @@ Respond in JSON format:
             print(f"Error extracting memories from conversation: {e}")
             return []
     
+    @staticmethod
+    def _lookup_extraction(cache_key: Tuple[int, str]) -> Optional[List[Dict[str, Any]]]:
+        """Get the cached extraction result for an identical conversation"""
+        with _extraction_cache_lock:
+            cached = _extraction_cache.get(cache_key)
+            if cached is not None:
+                _extraction_cache.move_to_end(cache_key)
+            return cached
+    
+    @staticmethod
+    def _store_extraction(
+        cache_key: Tuple[int, str],
+        extracted_data: List[Dict[str, Any]]
+    ) -> None:
+        """Cache an extraction result for later identical conversations"""
+        with _extraction_cache_lock:
+            _extraction_cache[cache_key] = extracted_data
+            if len(_extraction_cache) > EXTRACTION_CACHE_SIZE:
+                _extraction_cache.popitem(last=False)
+    
     def _format_conversation(self, conversation: List[Dict[str, str]]) -> str:
         """Format conversation messages into readable text"""
-        formatted = []
-        for msg in conversation:
-            role = msg.get('role', 'unknown').capitalize()
-            content = msg.get('content', '')
-            formatted.append(f"{role}: {content}")
-        
-        return "\n\n".join(formatted)
+        return "\n\n".join(
+            f"{msg.get('role', 'unknown').capitalize()}: {msg.get('content', '')}"
+            for msg in conversation
+        )
     
     def _parse_extraction_response(self, response: str) -> List[Dict]:
         """Parse LLM response to extract memory data"""
         try:
             # Try to find JSON in the response
-            # Look for JSON array pattern
-            json_match = re.search(r'\[.*\]', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                memories = json.loads(json_str)
-                return memories
+            # Fast path: the span from the first '[' to the last ']', which
+            # is the whole array in a well-formed response
+            start = response.find('[')
+            end = response.rfind(']')
+            if start != -1 and end > start:
+                try:
+                    return _json_loads(response[start:end + 1])
+                except json.JSONDecodeError:
+                    pass
+                
+                # Otherwise look through the balanced JSON arrays, e.g. when
+                # prose around the JSON also contains brackets. References
+                # like [1] parse too, so prefer the first array of objects
+                fallback = None
+                for json_str in _iter_json_arrays(response):
+                    try:
+                        parsed = _json_loads(json_str)
+                    except json.JSONDecodeError:
+                        continue
+                    if parsed and all(isinstance(item, dict) for item in parsed):
+                        return parsed
+                    if fallback is None:
+                        fallback = parsed
+                if fallback is not None:
+                    return fallback
             
             # Try parsing entire response as JSON
-            memories = json.loads(response)
+            memories = _json_loads(response)
             return memories
         
         except json.JSONDecodeError as e:
@@ -217,11 +362,60 @@ Respond in JSON format:
             print(f"Response: {response[:500]}")
             return []
     
+    @staticmethod
+    def _merge_batch_matches(
+        similar_memories: List[Tuple[Memory, float]],
+        memory_type: str,
+        embedding: Optional[List[float]],
+        batch_memories: List[Tuple[Memory, List[float]]]
+    ) -> List[Tuple[Memory, float]]:
+        """
+        Add memories saved earlier in the same batch to a candidate's similar
+        memories, since they weren't stored yet when the batch was searched
+        
+        Args:
+            similar_memories: Similar memories found by the batch search
+            memory_type: Candidate memory type
+            embedding: Candidate embedding
+            batch_memories: (Memory, embedding) pairs saved so far in the batch
+        
+        Returns:
+            Similar memories, most similar first
+        """
+        if not batch_memories or not embedding:
+            return similar_memories
+        
+        # Memories updated in this batch are rescored against their new content
+        batch_ids = {memory.id for memory, _ in batch_memories}
+        merged = [(memory, score) for memory, score in similar_memories if memory.id not in batch_ids]
+        
+        query = np.asarray(embedding)
+        query_norm = np.linalg.norm(query)
+        for memory, memory_embedding in batch_memories:
+            if memory.memory_type != memory_type:
+                continue
+            vector = np.asarray(memory_embedding)
+            similarity = float(query @ vector / (query_norm * np.linalg.norm(vector)))
+            if similarity >= CONFLICT_MIN_SIMILARITY:
+                merged.append((memory, similarity))
+        
+        merged.sort(key=lambda x: x[1], reverse=True)
+        merged = merged[:CONFLICT_SEARCH_LIMIT]
+        
+        # Record access as a search returning these memories would
+        for memory, _ in merged:
+            if memory.id in batch_ids:
+                memory.access_count += 1
+                memory.last_accessed = datetime.utcnow()
+        
+        return merged
+    
     def _create_memory_with_conflict_check(
         self,
         user_id: int,
         mem_data: Dict,
-        conversation_id: Optional[int] = None
+        conversation_id: Optional[int] = None,
+        similar_memories: Optional[List[Tuple[Memory, float]]] = None
     ) -> Optional[Memory]:
         """
         Create memory with conflict resolution
@@ -230,6 +424,7 @@ Respond in JSON format:
             user_id: User ID
             mem_data: Extracted memory data
             conversation_id: Optional conversation ID
+            similar_memories: Similar existing memories, if already searched
         
         Returns:
             Created or updated Memory object
@@ -239,13 +434,14 @@ Respond in JSON format:
             memory_type = mem_data.get('memory_type', 'fact')
             
             # Search for similar existing memories
-            similar_memories = self.memory_manager.search_memories(
-                user_id=user_id,
-                query=content,
-                memory_types=[memory_type],
-                limit=5,
-                min_similarity=0.7  # High threshold for conflict detection
-            )
+            if similar_memories is None:
+                similar_memories = self.memory_manager.search_memories(
+                    user_id=user_id,
+                    query=content,
+                    memory_types=[memory_type],
+                    limit=CONFLICT_SEARCH_LIMIT,
+                    min_similarity=CONFLICT_MIN_SIMILARITY  # High threshold for conflict detection
+                )
             
             # If very similar memories exist, check for conflicts
             if similar_memories and similar_memories[0][1] > 0.85:
@@ -373,6 +569,21 @@ You have access to the following information about the user from previous intera
 Use this context to provide more personalized and relevant responses. Reference these memories naturally when appropriate, but don't force them into the conversation.
 """
     
+    # Section headings per memory type; other types get a generic heading
+    TYPE_LABELS = {
+        'personal_info': '👤 Personal Information',
+        'preference': '⭐ Preferences',
+        'fact': '💡 Facts',
+        'task': '✅ Tasks',
+        'goal': '🎯 Goals',
+        'relationship': '👥 Relationships',
+        'conversation_summary': '💬 Previous Discussions'
+    }
+    
+    # Importance indicators, indexed by how many of the 0.5 / 0.8
+    # thresholds a memory's importance score exceeds
+    IMPORTANCE_INDICATORS = ("⚪", "🟡", "🔴")
+    
     def __init__(self, memory_manager: MemoryManager):
         """
         Initialize memory injector
@@ -436,32 +647,22 @@ Use this context to provide more personalized and relevant responses. Reference
         """Format memories for prompt injection"""
         formatted = []
         
-        # Group by type
-        by_type = {}
-        for memory, score in memories:
-            mem_type = memory.memory_type
-            if mem_type not in by_type:
-                by_type[mem_type] = []
-            by_type[mem_type].append((memory, score))
+        # Group by type, keeping each importance score alongside for sorting
+        by_type = defaultdict(list)
+        for memory, _ in memories:
+            by_type[memory.memory_type].append((memory.importance_score, memory))
         
         # Format each type
-        type_labels = {
-            'personal_info': '👤 Personal Information',
-            'preference': '⭐ Preferences',
-            'fact': '💡 Facts',
-            'task': '✅ Tasks',
-            'goal': '🎯 Goals',
-            'relationship': '👥 Relationships',
-            'conversation_summary': '💬 Previous Discussions'
-        }
+        type_labels = self.TYPE_LABELS
+        indicators = self.IMPORTANCE_INDICATORS
         
         for mem_type, mem_list in by_type.items():
-            label = type_labels.get(mem_type, f"📌 {mem_type.replace('_', ' ').title()}")
+            label = type_labels.get(mem_type) or f"📌 {mem_type.replace('_', ' ').title()}"
             formatted.append(f"\n## {label}\n")
             
-            for memory, score in sorted(mem_list, key=lambda x: x[0].importance_score, reverse=True):
+            for importance_score, memory in sorted(mem_list, key=_by_importance, reverse=True):
                 # Add importance indicator
-                importance = "🔴" if memory.importance_score > 0.8 else "🟡" if memory.importance_score > 0.5 else "⚪"
+                importance = indicators[(importance_score > 0.5) + (importance_score > 0.8)]
                 
                 formatted.append(f"- {importance} {memory.content}")
                 
@@ -225,29 +225,54 @@ class VectorStore:
         Returns:
             List of similar memories with scores
         """
+        return self.search_similar_batch([query_embedding], n_results, where_filter)[0]
+    
+    def search_similar_batch(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where_filter: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Search for memories similar to each of several embeddings in one query
+        
+        Args:
+            query_embeddings: Query embedding vectors
+            n_results: Number of results to return per query
+            where_filter: Optional metadata filter
+        
+        Returns:
+            List of similar memories with scores for each query, in order
+        """
+        if not query_embeddings:
+            return []
+        
         try:
             results = self.collection.query(
-                query_embeddings=[query_embedding],
+                query_embeddings=query_embeddings,
                 n_results=n_results,
                 where=where_filter
             )
             
             # Format results
-            memories = []
-            for i in range(len(results['ids'][0])):
-                memories.append({
-                    'id': int(results['ids'][0][i]),
-                    'distance': results['distances'][0][i],
-                    'similarity': 1 - results['distances'][0][i],  # Convert distance to similarity
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i]
-                })
-            
-            return memories
+            batch = []
+            for q in range(len(query_embeddings)):
+                memories = []
+                for i in range(len(results['ids'][q])):
+                    memories.append({
+                        'id': int(results['ids'][q][i]),
+                        'distance': results['distances'][q][i],
+                        'similarity': 1 - results['distances'][q][i],  # Convert distance to similarity
+                        'content': results['documents'][q][i],
+                        'metadata': results['metadatas'][q][i]
+                    })
+                batch.append(memories)
+            
+            return batch
         
         except Exception as e:
             print(f"Vector search error: {e}")
-            return []
+            return [[] for _ in query_embeddings]
     
     def delete_memory(self, memory_id: int):
         """Delete a memory from vector store"""
@@ -422,35 +447,14 @@ class MemoryManager:
                 where_filter={'user_id': user_id}  # Keep as integer to match stored type
             )
             
-            # Fetch full memory objects and apply filters
-            results = []
-            for mem_result in similar_memories:
-                if mem_result['similarity'] < min_similarity:
-                    continue
-                
-                # Get memory from database
-                memory = self.db.query(Memory).filter(
-                    Memory.id == mem_result['id']
-                ).first()
-                
-                if not memory:
-                    continue
-                
-                # Apply filters
-                if not include_inactive and not memory.is_active:
-                    continue
-                
-                if memory_types and memory.memory_type not in memory_types:
-                    continue
-                
-                # Update access tracking
-                memory.access_count += 1
-                memory.last_accessed = datetime.utcnow()
-                
-                results.append((memory, mem_result['similarity']))
-                
-                if len(results) >= limit:
-                    break
+            results = self._collect_search_results(
+                similar_memories,
+                self._fetch_memories(similar_memories),
+                memory_types,
+                limit,
+                min_similarity,
+                include_inactive
+            )
             
             self.db.commit()
             
@@ -460,6 +464,126 @@ class MemoryManager:
             print(f"Error searching memories: {e}")
             return []
     
+    def batch_search_memories(
+        self,
+        user_id: int,
+        queries: List[str],
+        memory_types: Optional[List[Optional[List[str]]]] = None,
+        limit: int = 10,
+        min_similarity: float = 0.5,
+        include_inactive: bool = False,
+        query_embeddings: Optional[List[Optional[List[float]]]] = None
+    ) -> List[List[Tuple[Memory, float]]]:
+        """
+        Search for relevant memories for several queries at once
+        
+        All queries are embedded in one batch and sent to the vector store as
+        one query, and the matching memories are loaded in one database query.
+        
+        Args:
+            user_id: User ID
+            queries: Search queries
+            memory_types: Memory type filter for each query (None for no filter)
+            limit: Maximum results per query
+            min_similarity: Minimum similarity threshold
+            include_inactive: Include inactive memories
+            query_embeddings: Precomputed embeddings for the queries, if the
+                caller already has them
+        
+        Returns:
+            List of (Memory, similarity_score) tuples for each query, in order
+        """
+        batch_results: List[List[Tuple[Memory, float]]] = [[] for _ in queries]
+        if not queries:
+            return batch_results
+        
+        try:
+            # Generate query embeddings
+            if query_embeddings is None:
+                query_embeddings = self.embedder.batch_generate_embeddings(queries)
+            
+            embedded = [i for i, embedding in enumerate(query_embeddings) if embedding]
+            if not embedded:
+                return batch_results
+            
+            # Search vector store
+            similar_batch = self.vector_store.search_similar_batch(
+                query_embeddings=[query_embeddings[i] for i in embedded],
+                n_results=limit * 2,  # Get more than needed for filtering
+                where_filter={'user_id': user_id}  # Keep as integer to match stored type
+            )
+            
+            # Load every candidate memory in one query
+            memories_by_id = self._fetch_memories(
+                [mem_result for similar in similar_batch for mem_result in similar]
+            )
+            
+            for i, similar_memories in zip(embedded, similar_batch):
+                batch_results[i] = self._collect_search_results(
+                    similar_memories,
+                    memories_by_id,
+                    memory_types[i] if memory_types else None,
+                    limit,
+                    min_similarity,
+                    include_inactive
+                )
+            
+            self.db.commit()
+            
+            return batch_results
+        
+        except Exception as e:
+            print(f"Error searching memories: {e}")
+            return [[] for _ in queries]
+    
+    def _fetch_memories(self, similar_memories: List[Dict]) -> Dict[int, Memory]:
+        """Load the memories for vector search results in one query"""
+        memory_ids = {mem_result['id'] for mem_result in similar_memories}
+        if not memory_ids:
+            return {}
+        
+        return {
+            memory.id: memory
+            for memory in self.db.query(Memory).filter(Memory.id.in_(memory_ids))
+        }
+    
+    def _collect_search_results(
+        self,
+        similar_memories: List[Dict],
+        memories_by_id: Dict[int, Memory],
+        memory_types: Optional[List[str]],
+        limit: int,
+        min_similarity: float,
+        include_inactive: bool
+    ) -> List[Tuple[Memory, float]]:
+        """Apply search filters to vector results and record access"""
+        results = []
+        for mem_result in similar_memories:
+            if mem_result['similarity'] < min_similarity:
+                continue
+            
+            memory = memories_by_id.get(mem_result['id'])
+            if not memory:
+                continue
+            
+            # Apply filters
+            if not include_inactive and not memory.is_active:
+                continue
+            
+            if memory_types and memory.memory_type not in memory_types:
+                continue
+            
+            # Update access tracking
+            memory.access_count += 1
+            memory.last_accessed = datetime.utcnow()
+            
+            results.append((memory, mem_result['similarity']))
+            
+            if len(results) >= limit:
+                break
+        
+        return results
+    
     def get_pinned_memories(self, user_id: int) -> List[Memory]:
         """Get all pinned memories for a user"""
         return self.db.query(Memory).filter(
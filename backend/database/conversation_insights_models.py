@@ -34,6 +34,7 @@ class ConversationSummary(Base):
     message_count = Column(Integer, default=0)
     generation_method = Column(String(50), default='auto')  # auto, manual
     model_used = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True)  # Digest of summarized messages
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -73,7 +74,7 @@ class ConversationInsight(Base):
     __tablename__ = 'conversation_insights'
     
     id = Column(Integer, primary_key=True, index=True)
-    conversation_id = Column(Integer, ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False, index=True)
+    conversation_id = Column(Integer, ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False, unique=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Topic analysis
@@ -99,6 +100,9 @@ class ConversationInsight(Base):
     # Time tracking
     conversation_duration_minutes = Column(Integer, nullable=True)
     
+    # Change detection
+    content_hash = Column(String(64), nullable=True)  # Digest of analyzed messages
+    
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -175,7 +179,13 @@ class ConversationSuggestion(Base):
     # Indexes
     __table_args__ = (
         Index('idx_suggestion_user_type', 'user_id', 'suggestion_type'),
-        Index('idx_suggestion_conversation_active', 'conversation_id', 'was_used'),
+        # Partial index over the small live slice of the table: unused
+        # suggestions, expired on regeneration and read back by rank
+        Index(
+            'idx_suggestion_conversation_unused', 'conversation_id', 'rank',
+            sqlite_where=was_used == False,
+            postgresql_where=was_used == False
+        ),
     )
     
     def to_dict(self):
@@ -1,8 +1,8 @@
 """
 Database operations for file management
 """
-from sqlalchemy import create_engine, desc, or_, and_
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, desc, or_, and_, Row, exists, insert, literal, select, DateTime, Integer, String
+from sqlalchemy.orm import sessionmaker, Session, defer
 from typing import List, Optional, Dict, Tuple
 from datetime import datetime
 import os
@@ -15,6 +15,19 @@ from backend.config.settings import settings
 # Import existing engine and session from operations.py
 from backend.database.operations import engine, SessionLocal, get_db
 
+# Columns needed to render file listings; leaves out large text columns
+LISTING_COLUMNS = (
+    File.id,
+    File.filename,
+    File.original_filename,
+    File.file_type,
+    File.file_size,
+    File.folder_path,
+    File.thumbnail_path,
+    File.uploaded_at,
+    File.description
+)
+
 
 class FileDB:
     """Database operations for file management"""
@@ -33,7 +46,10 @@ class FileDB:
         thumbnail_path: Optional[str] = None,
         author: Optional[str] = None,
         creation_date: Optional[datetime] = None,
-        folder_path: str = "/"
+        folder_path: str = "/",
+        content_hash: Optional[str] = None,
+        parser_version: Optional[int] = None,
+        parse_status: Optional[str] = None
     ) -> File:
         """Create a new file record"""
         db = get_db()
@@ -48,10 +64,15 @@ class FileDB:
                 file_path=file_path,
                 description=description,
                 extracted_text=extracted_text,
+                has_text=bool(extracted_text),
+                text_length=len(extracted_text) if extracted_text is not None else None,
                 thumbnail_path=thumbnail_path,
                 author=author,
                 creation_date=creation_date,
-                folder_path=folder_path
+                folder_path=folder_path,
+                content_hash=content_hash,
+                parser_version=parser_version,
+                parse_status=parse_status
             )
             db.add(file)
             db.commit()
@@ -61,11 +82,19 @@ class FileDB:
             db.close()
     
     @staticmethod
-    def get_file(file_id: int) -> Optional[File]:
-        """Get a file by ID"""
+    def get_file(file_id: int, load_text: bool = True) -> Optional[File]:
+        """
+        Get a file by ID
+        
+        With load_text=False the extracted_text column is not loaded and
+        must not be accessed on the returned (detached) record.
+        """
         db = get_db()
         try:
-            return db.query(File).filter(File.id == file_id).first()
+            query = db.query(File)
+            if not load_text:
+                query = query.options(defer(File.extracted_text))
+            return query.filter(File.id == file_id).first()
         finally:
             db.close()
     
@@ -80,6 +109,67 @@ class FileDB:
         finally:
             db.close()
     
+    @staticmethod
+    def _user_files_query(
+        db: Session,
+        entities: tuple,
+        user_id: int,
+        folder_path: Optional[str],
+        file_type: Optional[str],
+        sort_by: str,
+        sort_order: str
+    ):
+        """Build the filtered, sorted query behind file listings"""
+        query = db.query(*entities).filter(File.user_id == user_id)
+        
+        # Filter by folder
+        if folder_path is not None:
+            query = query.filter(File.folder_path == folder_path)
+        
+        # Filter by file type
+        if file_type:
+            query = query.filter(File.file_type == file_type)
+        
+        # Apply sorting
+        sort_column = getattr(File, sort_by, File.uploaded_at)
+        if sort_order == "desc":
+            query = query.order_by(desc(sort_column))
+        else:
+            query = query.order_by(sort_column)
+        
+        return query
+    
+    @staticmethod
+    def _search_files_query(
+        db: Session,
+        entities: tuple,
+        user_id: int,
+        search_query: str,
+        file_type: Optional[str],
+        tags: Optional[List[str]]
+    ):
+        """Build the query behind file search"""
+        query = db.query(*entities).filter(File.user_id == user_id)
+        
+        # Search in filename, description, and extracted text
+        search_filter = or_(
+            File.filename.ilike(f"%{search_query}%"),
+            File.original_filename.ilike(f"%{search_query}%"),
+            File.description.ilike(f"%{search_query}%"),
+            File.extracted_text.ilike(f"%{search_query}%")
+        )
+        query = query.filter(search_filter)
+        
+        # Filter by file type
+        if file_type:
+            query = query.filter(File.file_type == file_type)
+        
+        # Filter by tags
+        if tags:
+            query = query.join(FileTag).filter(FileTag.tag.in_(tags))
+        
+        return query.order_by(desc(File.uploaded_at))
+    
     @staticmethod
     def list_user_files(
         user_id: int,
@@ -93,29 +183,35 @@ class FileDB:
         """List files for a user with optional filtering"""
         db = get_db()
         try:
-            query = db.query(File).filter(File.user_id == user_id)
-            
-            # Filter by folder
-            if folder_path is not None:
-                query = query.filter(File.folder_path == folder_path)
-            
-            # Filter by file type
-            if file_type:
-                query = query.filter(File.file_type == file_type)
-            
-            # Apply sorting
-            sort_column = getattr(File, sort_by, File.uploaded_at)
-            if sort_order == "desc":
-                query = query.order_by(desc(sort_column))
-            else:
-                query = query.order_by(sort_column)
-            
+            query = FileDB._user_files_query(
+                db, (File,), user_id, folder_path, file_type, sort_by, sort_order
+            )
             files = query.limit(limit).offset(offset).all()
             db.expunge_all()
             return files
         finally:
             db.close()
     
+    @staticmethod
+    def list_user_file_rows(
+        user_id: int,
+        folder_path: Optional[str] = None,
+        file_type: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+        sort_by: str = "uploaded_at",
+        sort_order: str = "desc"
+    ) -> List[Row]:
+        """List files as plain rows of LISTING_COLUMNS (no ORM hydration)"""
+        db = get_db()
+        try:
+            query = FileDB._user_files_query(
+                db, LISTING_COLUMNS, user_id, folder_path, file_type, sort_by, sort_order
+            )
+            return query.limit(limit).offset(offset).all()
+        finally:
+            db.close()
+    
     @staticmethod
     def search_files(
         user_id: int,
@@ -127,31 +223,36 @@ class FileDB:
         """Search files by name, description, or content"""
         db = get_db()
         try:
-            query = db.query(File).filter(File.user_id == user_id)
-            
-            # Search in filename, description, and extracted text
-            search_filter = or_(
-                File.filename.ilike(f"%{search_query}%"),
-                File.original_filename.ilike(f"%{search_query}%"),
-                File.description.ilike(f"%{search_query}%"),
-                File.extracted_text.ilike(f"%{search_query}%")
+            query = FileDB._search_files_query(
+                db, (File,), user_id, search_query, file_type, tags
             )
-            query = query.filter(search_filter)
-            
-            # Filter by file type
-            if file_type:
-                query = query.filter(File.file_type == file_type)
-            
-            # Filter by tags
-            if tags:
-                query = query.join(FileTag).filter(FileTag.tag.in_(tags))
-            
-            files = query.order_by(desc(File.uploaded_at)).limit(limit).all()
+            files = query.limit(limit).all()
             db.expunge_all()
             return files
         finally:
             db.close()
     
+    @staticmethod
+    def search_file_rows(
+        user_id: int,
+        search_query: str,
+        file_type: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: int = 50
+    ) -> List[Row]:
+        """Search files, returning plain rows of LISTING_COLUMNS"""
+        db = get_db()
+        try:
+            query = FileDB._search_files_query(
+                db, LISTING_COLUMNS, user_id, search_query, file_type, tags
+            )
+            # Tag joins can repeat a file; entity queries dedupe, rows don't
+            if tags:
+                query = query.distinct()
+            return query.limit(limit).all()
+        finally:
+            db.close()
+    
     @staticmethod
     def update_file(
         file_id: int,
@@ -159,7 +260,9 @@ class FileDB:
         description: Optional[str] = None,
         folder_path: Optional[str] = None,
         extracted_text: Optional[str] = None,
-        thumbnail_path: Optional[str] = None
+        thumbnail_path: Optional[str] = None,
+        parser_version: Optional[int] = None,
+        parse_status: Optional[str] = None
     ) -> Optional[File]:
         """Update file metadata"""
         db = get_db()
@@ -176,8 +279,14 @@ class FileDB:
                 file.folder_path = folder_path
             if extracted_text is not None:
                 file.extracted_text = extracted_text
+                file.has_text = bool(extracted_text)
+                file.text_length = len(extracted_text)
             if thumbnail_path is not None:
                 file.thumbnail_path = thumbnail_path
+            if parser_version is not None:
+                file.parser_version = parser_version
+            if parse_status is not None:
+                file.parse_status = parse_status
             
             file.updated_at = datetime.utcnow()
             db.commit()
@@ -186,6 +295,43 @@ class FileDB:
         finally:
             db.close()
     
+    @staticmethod
+    def update_file_if_owner(file_id: int, user_id: int, **fields) -> bool:
+        """Update file columns in one statement, only if user_id owns the file"""
+        db = get_db()
+        try:
+            fields['updated_at'] = datetime.utcnow()
+            count = db.query(File).filter(
+                and_(File.id == file_id, File.user_id == user_id)
+            ).update(fields, synchronize_session=False)
+            db.commit()
+            return count > 0
+        finally:
+            db.close()
+    
+    @staticmethod
+    def is_file_owner(file_id: int, user_id: int) -> bool:
+        """Check file ownership without loading the row"""
+        db = get_db()
+        try:
+            return db.query(File.id).filter(
+                and_(File.id == file_id, File.user_id == user_id)
+            ).first() is not None
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_extracted_text(file_id: int, user_id: int) -> Optional[str]:
+        """Get a file's extracted text if user_id owns it"""
+        db = get_db()
+        try:
+            row = db.query(File.extracted_text).filter(
+                and_(File.id == file_id, File.user_id == user_id)
+            ).first()
+            return row[0] if row else None
+        finally:
+            db.close()
+    
     @staticmethod
     def delete_file(file_id: int) -> bool:
         """Delete a file record"""
@@ -201,6 +347,86 @@ class FileDB:
         finally:
             db.close()
     
+    @staticmethod
+    def get_files_bulk(file_ids: List[int], user_id: int) -> List[File]:
+        """Get the files among file_ids that belong to user_id in one query"""
+        if not file_ids:
+            return []
+        
+        db = get_db()
+        try:
+            files = db.query(File).filter(
+                and_(File.id.in_(file_ids), File.user_id == user_id)
+            ).all()
+            db.expunge_all()
+            return files
+        finally:
+            db.close()
+    
+    @staticmethod
+    def delete_files_bulk(file_ids: List[int]) -> int:
+        """Delete file records and their tags/attachments in one transaction"""
+        if not file_ids:
+            return 0
+        
+        db = get_db()
+        try:
+            # Bulk deletes bypass ORM cascades, so clear dependents explicitly
+            db.query(FileTag).filter(
+                FileTag.file_id.in_(file_ids)
+            ).delete(synchronize_session=False)
+            db.query(ConversationFile).filter(
+                ConversationFile.file_id.in_(file_ids)
+            ).delete(synchronize_session=False)
+            count = db.query(File).filter(
+                File.id.in_(file_ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            return count
+        finally:
+            db.close()
+    
+    @staticmethod
+    def find_by_hash(user_id: int, content_hash: str, file_type: str) -> Optional[File]:
+        """Find a user's earlier upload with identical content, preferring one with text"""
+        db = get_db()
+        try:
+            return db.query(File).filter(
+                and_(
+                    File.user_id == user_id,
+                    File.content_hash == content_hash,
+                    File.file_type == file_type
+                )
+            ).order_by(desc(File.has_text), desc(File.id)).first()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def count_files_with_hash(content_hash: str, file_type: str) -> int:
+        """Count file records sharing the same content digest and type"""
+        db = get_db()
+        try:
+            return db.query(File).filter(
+                and_(File.content_hash == content_hash, File.file_type == file_type)
+            ).count()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_referenced_hashes(content_hashes: List[str]) -> set:
+        """Get the (content_hash, file_type) pairs still used by any file"""
+        if not content_hashes:
+            return set()
+        
+        db = get_db()
+        try:
+            rows = db.query(File.content_hash, File.file_type).filter(
+                File.content_hash.in_(content_hashes)
+            ).distinct().all()
+            return {(r[0], r[1]) for r in rows}
+        finally:
+            db.close()
+    
     @staticmethod
     def get_user_storage_usage(user_id: int) -> Dict[str, any]:
         """Get storage usage statistics for a user"""
@@ -290,6 +516,25 @@ class FileTagDB:
         finally:
             db.close()
     
+    @staticmethod
+    def get_tags_for_files(file_ids: List[int]) -> Dict[int, List[str]]:
+        """Get tags for many files in one query, keyed by file ID"""
+        if not file_ids:
+            return {}
+        
+        db = get_db()
+        try:
+            rows = db.query(FileTag.file_id, FileTag.tag).filter(
+                FileTag.file_id.in_(file_ids)
+            ).order_by(FileTag.id).all()
+            
+            tag_map: Dict[int, List[str]] = {}
+            for file_id, tag in rows:
+                tag_map.setdefault(file_id, []).append(tag)
+            return tag_map
+        finally:
+            db.close()
+    
     @staticmethod
     def get_all_user_tags(user_id: int) -> List[Tuple[str, int]]:
         """Get all unique tags for a user with usage count"""
@@ -324,6 +569,50 @@ class FileTagDB:
             if FileTagDB.remove_tag(file_id, tag.strip()):
                 count += 1
         return count
+    
+    @staticmethod
+    def bulk_add_tags_if_owner(file_id: int, user_id: int, tags: List[str]) -> bool:
+        """Add tags in one transaction if user_id owns the file"""
+        db = get_db()
+        try:
+            if db.query(File.id).filter(
+                and_(File.id == file_id, File.user_id == user_id)
+            ).first() is None:
+                return False
+            
+            existing = {
+                t[0] for t in db.query(FileTag.tag).filter(FileTag.file_id == file_id).all()
+            }
+            for tag in tags:
+                tag = tag.strip().lower()
+                if tag and tag not in existing:
+                    db.add(FileTag(file_id=file_id, tag=tag))
+                    existing.add(tag)
+            db.commit()
+            return True
+        finally:
+            db.close()
+    
+    @staticmethod
+    def bulk_remove_tags_if_owner(file_id: int, user_id: int, tags: List[str]) -> bool:
+        """Remove tags with one DELETE if user_id owns the file"""
+        db = get_db()
+        try:
+            if db.query(File.id).filter(
+                and_(File.id == file_id, File.user_id == user_id)
+            ).first() is None:
+                return False
+            
+            db.query(FileTag).filter(
+                and_(
+                    FileTag.file_id == file_id,
+                    FileTag.tag.in_([tag.strip().lower() for tag in tags])
+                )
+            ).delete(synchronize_session=False)
+            db.commit()
+            return True
+        finally:
+            db.close()
 
 
 class ConversationFileDB:
@@ -363,6 +652,51 @@ class ConversationFileDB:
         finally:
             db.close()
     
+    @staticmethod
+    def bulk_attach(
+        conversation_id: int,
+        file_ids: List[int],
+        user_id: int,
+        message_id: Optional[int] = None,
+        context_type: Optional[str] = None
+    ) -> int:
+        """
+        Attach the files in file_ids owned by user_id with one INSERT ... SELECT
+        
+        Files that are already attached are skipped. Returns the number of
+        new attachments.
+        """
+        if not file_ids:
+            return 0
+        
+        db = get_db()
+        try:
+            already_attached = exists().where(
+                and_(
+                    ConversationFile.conversation_id == conversation_id,
+                    ConversationFile.file_id == File.id
+                )
+            )
+            owned_files = select(
+                literal(conversation_id, Integer),
+                File.id,
+                literal(message_id, Integer),
+                literal(context_type, String),
+                literal(datetime.utcnow(), DateTime)
+            ).where(
+                and_(File.id.in_(file_ids), File.user_id == user_id, ~already_attached)
+            )
+            result = db.execute(
+                insert(ConversationFile).from_select(
+                    ['conversation_id', 'file_id', 'message_id', 'context_type', 'attached_at'],
+                    owned_files
+                )
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+    
     @staticmethod
     def detach_file_from_conversation(conversation_id: int, file_id: int) -> bool:
         """Detach a file from a conversation"""
@@ -389,7 +723,7 @@ class ConversationFileDB:
         """Get all files attached to a conversation"""
         db = get_db()
         try:
-            files = db.query(File).join(ConversationFile).filter(
+            files = db.query(File).options(defer(File.extracted_text)).join(ConversationFile).filter(
                 ConversationFile.conversation_id == conversation_id
             ).order_by(desc(ConversationFile.attached_at)).all()
             db.expunge_all()
@@ -402,7 +736,7 @@ class ConversationFileDB:
         """Get all files attached to a specific message"""
         db = get_db()
         try:
-            files = db.query(File).join(ConversationFile).filter(
+            files = db.query(File).options(defer(File.extracted_text)).join(ConversationFile).filter(
                 ConversationFile.message_id == message_id
             ).order_by(desc(ConversationFile.attached_at)).all()
             db.expunge_all()
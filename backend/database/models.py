@@ -3,7 +3,7 @@ Database models for storing conversations, messages, and attachments
 """
 from sqlalchemy import (
     Column, Integer, String, Text, Float, 
-    DateTime, ForeignKey, Boolean, LargeBinary
+    DateTime, ForeignKey, Boolean, LargeBinary, Index
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -210,7 +210,12 @@ class File(Base):
     # File metadata
     description = Column(Text, nullable=True)
     extracted_text = Column(Text, nullable=True)  # Extracted text content for search
+    has_text = Column(Boolean, nullable=False, default=False)  # Whether extracted_text is non-empty
+    text_length = Column(Integer, nullable=True)  # Length of extracted_text in characters
+    parser_version = Column(Integer, nullable=True)  # FileParser.VERSION of the last extraction attempt
+    parse_status = Column(String(20), nullable=True)  # 'ok', 'empty', 'error' or None if never parsed
     thumbnail_path = Column(String(500), nullable=True)  # Path to thumbnail
+    content_hash = Column(String(64), nullable=True, index=True)  # Digest of the file bytes
     
     # File metadata from file itself
     author = Column(String(100), nullable=True)
@@ -228,6 +233,10 @@ class File(Base):
     tags = relationship("FileTag", back_populates="file", cascade="all, delete-orphan")
     conversation_files = relationship("ConversationFile", back_populates="file", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index('idx_files_user_parse_status', 'user_id', 'parse_status'),
+    )
+    
     def __repr__(self):
         return f"<File(id={self.id}, filename='{self.filename}', type='{self.file_type}')>"
 
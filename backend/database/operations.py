@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker, Session
 from typing import List, Optional
 from datetime import datetime
 from pathlib import Path
+import json
 
 from backend.database.models import Base, Conversation, Message, Attachment, ToolCall, UserSession
 from backend.config.settings import settings
@@ -34,8 +35,37 @@ try:
 except ImportError:
     pass  # Insights system may not be set up yet
 
+# JSON column serialization: orjson is several times faster than the stdlib
+# encoder on the insight/suggestion payloads; fall back to compact json.
+try:
+    import orjson
+
+    # Accept what the stdlib encoder did: int/float/bool/None dict keys and
+    # numpy scalars
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def _json_serializer(obj) -> str:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode('utf-8')
+        except TypeError:
+            # Anything else orjson rejects (e.g. ints over 64 bits, str
+            # subclasses as keys) goes through the stdlib encoder
+            return json.dumps(obj, separators=(',', ':'))
+
+    _json_deserializer = orjson.loads
+except ImportError:
+    def _json_serializer(obj) -> str:
+        return json.dumps(obj, separators=(',', ':'))
+
+    _json_deserializer = json.loads
+
 # Create engine and session
-engine = create_engine(settings.database_url, echo=False)
+engine = create_engine(
+    settings.database_url,
+    echo=False,
+    json_serializer=_json_serializer,
+    json_deserializer=_json_deserializer
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_database():
@@ -90,6 +120,128 @@ def init_database():
     except Exception as e:
         print(f"⚠️  Migration check failed (may be normal): {e}")
     
+    # Migration: Update conversation_summaries table (for existing databases)
+    try:
+        inspector = inspect(engine)
+        if 'conversation_summaries' in inspector.get_table_names():
+            columns = {col['name'] for col in inspector.get_columns('conversation_summaries')}
+            
+            # Add content_hash column if missing
+            if 'content_hash' not in columns:
+                print("🔄 Adding content_hash column to conversation_summaries table...")
+                with engine.connect() as conn:
+                    conn.execute(text("ALTER TABLE conversation_summaries ADD COLUMN content_hash VARCHAR(64)"))
+                    conn.commit()
+                print("✅ Added content_hash column")
+    except Exception as e:
+        print(f"⚠️  Summaries migration failed (may be normal): {e}")
+    
+    # Migration: Update conversation_insights table (for existing databases)
+    try:
+        inspector = inspect(engine)
+        if 'conversation_insights' in inspector.get_table_names():
+            columns = {col['name'] for col in inspector.get_columns('conversation_insights')}
+            
+            # Add content_hash column if missing
+            if 'content_hash' not in columns:
+                print("🔄 Adding content_hash column to conversation_insights table...")
+                with engine.connect() as conn:
+                    conn.execute(text("ALTER TABLE conversation_insights ADD COLUMN content_hash VARCHAR(64)"))
+                    conn.commit()
+                print("✅ Added content_hash column")
+            
+            has_unique = any(
+                idx.get('unique') and idx['column_names'] == ['conversation_id']
+                for idx in inspector.get_indexes('conversation_insights')
+            )
+            if not has_unique:
+                print("🔄 Adding unique index on conversation_insights.conversation_id...")
+                with engine.connect() as conn:
+                    # Keep only the newest insight row per conversation so
+                    # the index can be created
+                    removed = conn.execute(text(
+                        "DELETE FROM conversation_insights WHERE id NOT IN ("
+                        "SELECT MAX(id) FROM conversation_insights GROUP BY conversation_id)"
+                    )).rowcount
+                    if removed:
+                        print(f"🧹 Removed {removed} duplicate conversation insight rows")
+                    conn.execute(text(
+                        "CREATE UNIQUE INDEX uq_ci_conv_id ON conversation_insights(conversation_id)"
+                    ))
+                    conn.commit()
+                print("✅ Added unique index on conversation insights")
+    except Exception as e:
+        print(f"⚠️  Insights index migration failed (may be normal): {e}")
+    
+    # Migration: Update files table (for existing databases)
+    try:
+        inspector = inspect(engine)
+        if 'files' in inspector.get_table_names():
+            columns = {col['name'] for col in inspector.get_columns('files')}
+            
+            # Add content_hash column if missing
+            if 'content_hash' not in columns:
+                print("🔄 Adding content_hash column to files table...")
+                with engine.connect() as conn:
+                    conn.execute(text("ALTER TABLE files ADD COLUMN content_hash VARCHAR(64)"))
+                    conn.execute(text(
+                        "CREATE INDEX IF NOT EXISTS ix_files_content_hash ON files(content_hash)"
+                    ))
+                    conn.commit()
+                print("✅ Added content_hash column")
+            
+            # Add has_text/text_length columns if missing, backfilled from extracted_text
+            if 'has_text' not in columns:
+                print("🔄 Adding has_text/text_length columns to files table...")
+                false_sql = 'false' if engine.dialect.name == 'postgresql' else '0'
+                with engine.connect() as conn:
+                    conn.execute(text(
+                        f"ALTER TABLE files ADD COLUMN has_text BOOLEAN NOT NULL DEFAULT {false_sql}"
+                    ))
+                    conn.execute(text("ALTER TABLE files ADD COLUMN text_length INTEGER"))
+                    conn.execute(text(
+                        "UPDATE files SET has_text = (extracted_text IS NOT NULL AND extracted_text <> ''), "
+                        "text_length = LENGTH(extracted_text)"
+                    ))
+                    conn.commit()
+                print("✅ Added has_text/text_length columns")
+            
+            # Add parser_version/parse_status columns if missing
+            if 'parse_status' not in columns:
+                print("🔄 Adding parser_version/parse_status columns to files table...")
+                with engine.connect() as conn:
+                    conn.execute(text("ALTER TABLE files ADD COLUMN parser_version INTEGER"))
+                    conn.execute(text("ALTER TABLE files ADD COLUMN parse_status VARCHAR(20)"))
+                    conn.execute(text(
+                        "CREATE INDEX IF NOT EXISTS idx_files_user_parse_status "
+                        "ON files(user_id, parse_status)"
+                    ))
+                    conn.commit()
+                print("✅ Added parser_version/parse_status columns")
+    except Exception as e:
+        print(f"⚠️  Files migration failed (may be normal): {e}")
+    
+    # Migration: Replace the suggestion lookup index (for existing databases)
+    try:
+        inspector = inspect(engine)
+        if 'conversation_suggestions' in inspector.get_table_names():
+            # Boolean literal must match what queries render for the planner
+            # to use the partial index
+            false_sql = 'false' if engine.dialect.name == 'postgresql' else '0'
+            with engine.connect() as conn:
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS idx_suggestion_conversation_unused "
+                    "ON conversation_suggestions(conversation_id, rank) "
+                    f"WHERE was_used = {false_sql}"
+                ))
+                # Superseded by the partial index above
+                conn.execute(text("DROP INDEX IF EXISTS idx_suggestion_conversation_pending"))
+                conn.execute(text("DROP INDEX IF EXISTS idx_suggestion_conversation_live"))
+                conn.execute(text("DROP INDEX IF EXISTS idx_suggestion_conversation_active"))
+                conn.commit()
+    except Exception as e:
+        print(f"⚠️  Suggestions index migration failed (may be normal): {e}")
+    
     print("✓ Database initialized")
     print("ℹ️  First-time users: Please sign up to create an account")
 
@@ -224,16 +376,38 @@ class MessageDB:
             db.close()
     
     @staticmethod
-    def get_messages(conversation_id: int) -> List[Message]:
-        """Get all messages in a conversation"""
-        db = get_db()
+    def get_messages(conversation_id: int, db: Optional[Session] = None) -> List[Message]:
+        """Get all messages in a conversation, optionally on a caller-owned session"""
+        should_close = False
+        if db is None:
+            db = get_db()
+            should_close = True
+        
         try:
             messages = db.query(Message).filter(
                 Message.conversation_id == conversation_id
             ).order_by(Message.created_at).all()
-            # Detach from session to avoid lazy loading issues
-            db.expunge_all()
+            if should_close:
+                # Detach from session to avoid lazy loading issues
+                db.expunge_all()
             return messages
+        finally:
+            if should_close:
+                db.close()
+    
+    @staticmethod
+    def get_messages_light(conversation_id: int) -> list:
+        """
+        Get (id, role, content) rows for a conversation's messages
+        
+        Rows expose .id, .role and .content like Message objects but skip
+        hydrating full ORM instances, for read-only analysis paths.
+        """
+        db = get_db()
+        try:
+            return db.query(Message.id, Message.role, Message.content).filter(
+                Message.conversation_id == conversation_id
+            ).order_by(Message.created_at).all()
         finally:
             db.close()
     
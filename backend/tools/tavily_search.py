@@ -128,29 +128,26 @@ class TavilySearchTool:
                     except Exception as e:
                         print(f"⚠️ Could not get user_id from session: {e}, using default: {user_id}")
                     
+                    # Download up to 5 images concurrently, but only show 3
+                    candidate_urls = images[:5]
+                    for idx, img_url in enumerate(candidate_urls, 1):
+                        print(f"📥 Attempting to download image {idx}: {img_url[:80]}...")
+                    
+                    img_results = image_handler.save_from_urls(candidate_urls, user_id, source='search')
+                    
                     successful_images = 0
-                    for idx, img_url in enumerate(images[:5], 1):  # Try up to 5 images
-                        if successful_images >= 3:  # But only show 3
+                    for img_result in img_results:
+                        if successful_images >= 3:
                             break
                         
-                        print(f"📥 Attempting to download image {idx}: {img_url[:80]}...")
-                        
-                        # Try to download and save image
-                        try:
-                            img_result = image_handler.save_from_url(img_url, user_id, source='search')
-                            
-                            if img_result.get('success'):
-                                successful_images += 1
-                                print(f"✅ Image {successful_images} downloaded: {img_result['relative_path']}")
-                                # Add image reference that will be displayed
-                                result_text.append(f"\n![Image {successful_images}]({img_result['relative_path']})")
-                                result_text.append(f"*Image {successful_images}* - {img_result.get('size_kb', 'unknown')} KB\n")
-                            else:
-                                print(f"❌ Image download failed: {img_result.get('error', 'Unknown error')}")
-                        except Exception as img_error:
-                            print(f"❌ Exception downloading image: {str(img_error)}")
-                            import traceback
-                            traceback.print_exc()
+                        if img_result.get('success'):
+                            successful_images += 1
+                            print(f"✅ Image {successful_images} downloaded: {img_result['relative_path']}")
+                            # Add image reference that will be displayed
+                            result_text.append(f"\n![Image {successful_images}]({img_result['relative_path']})")
+                            result_text.append(f"*Image {successful_images}* - {img_result.get('size_kb', 'unknown')} KB\n")
+                        else:
+                            print(f"❌ Image download failed: {img_result.get('error', 'Unknown error')}")
                     
                     print(f"✅ Successfully downloaded {successful_images} out of {len(images[:5])} images")
                     
@@ -11,6 +11,9 @@ from datetime import datetime
 class FileParser:
     """Parse and extract text from various file types"""
     
+    # Bump when extraction output changes so stored failed/empty parses are retried
+    VERSION = 1
+    
     @staticmethod
     def parse_pdf(file_path: Path) -> Dict[str, Any]:
         """Extract text from PDF using pdfplumber (better than PyPDF2)"""
@@ -5,7 +5,7 @@ import os
 import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import BinaryIO, Iterator, Optional, Tuple
 import hashlib
 import mimetypes
 
@@ -13,6 +13,9 @@ import mimetypes
 class FileStorage:
     """Manages file storage on disk"""
     
+    # Block size used when streaming files in and out
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
     # Default upload directory
     BASE_UPLOAD_DIR = Path("uploads")
     
@@ -46,6 +49,8 @@ class FileStorage:
         """Initialize file storage"""
         self.base_dir = base_dir or self.BASE_UPLOAD_DIR
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        # Directories already created by this instance; saves a mkdir per upload
+        self._known_dirs: set = set()
     
     @staticmethod
     def get_file_type(filename: str) -> str:
@@ -110,13 +115,20 @@ class FileStorage:
         safe_name = FileStorage.sanitize_filename(Path(original_filename).stem)
         return f"{safe_name}_{timestamp}_{file_hash}{ext}"
     
+    def _ensure_directory(self, path: Path) -> Path:
+        """Create a directory once per instance"""
+        if path not in self._known_dirs:
+            path.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(path)
+        return path
+    
     def get_user_directory(self, user_id: int, create: bool = True) -> Path:
         """Get or create user's storage directory organized by year/month"""
         now = datetime.now()
         user_dir = self.base_dir / str(user_id) / str(now.year) / f"{now.month:02d}"
         
         if create:
-            user_dir.mkdir(parents=True, exist_ok=True)
+            self._ensure_directory(user_dir)
         
         return user_dir
     
@@ -125,10 +137,22 @@ class FileStorage:
         thumb_dir = self.base_dir / str(user_id) / "thumbnails"
         
         if create:
-            thumb_dir.mkdir(parents=True, exist_ok=True)
+            self._ensure_directory(thumb_dir)
         
         return thumb_dir
     
+    @staticmethod
+    def compute_content_hash(file_data: bytes) -> str:
+        """Compute a hex digest identifying the file contents"""
+        return hashlib.blake2b(file_data, digest_size=32).hexdigest()
+    
+    def get_shared_thumbnail_path(self, content_hash: str, file_type: str) -> Path:
+        """Get the content-addressed thumbnail path shared across uploads"""
+        return (
+            self.base_dir / "thumbnails" / content_hash[:2]
+            / f"{content_hash}_{file_type}.jpg"
+        )
+    
     def save_file(
         self,
         file_data: bytes,
@@ -162,6 +186,74 @@ class FileStorage:
         
         return relative_path, unique_filename, file_size
     
+    def save_stream(
+        self,
+        file_obj: BinaryIO,
+        original_filename: str,
+        user_id: int,
+        max_size: Optional[int] = None
+    ) -> Tuple[Optional[str], str, int, Optional[str]]:
+        """
+        Save a binary stream to disk block by block, hashing it on the way
+        
+        If more than max_size bytes arrive, copying stops and the partial
+        file is removed.
+        
+        Returns:
+            Tuple of (file_path relative to base_dir, unique_filename, file_size,
+            content_hash); file_path and content_hash are None when max_size
+            was exceeded, and file_size is then the number of bytes read
+        """
+        unique_filename = self.generate_unique_filename(original_filename, user_id)
+        full_path = self.get_user_directory(user_id) / unique_filename
+        
+        hasher = hashlib.blake2b(digest_size=32)
+        buffer = bytearray(self.STREAM_CHUNK_SIZE)
+        view = memoryview(buffer)
+        file_size = 0
+        
+        with open(full_path, 'wb') as f:
+            while True:
+                n = file_obj.readinto(view)
+                if not n:
+                    break
+                file_size += n
+                if max_size is not None and file_size > max_size:
+                    break
+                hasher.update(view[:n])
+                f.write(view[:n])
+        
+        if max_size is not None and file_size > max_size:
+            full_path.unlink()
+            return None, unique_filename, file_size, None
+        
+        relative_path = str(full_path.relative_to(self.base_dir))
+        return relative_path, unique_filename, file_size, hasher.hexdigest()
+    
+    def link_file(
+        self,
+        existing_relative_path: str,
+        original_filename: str,
+        user_id: int
+    ) -> Optional[Tuple[str, str, int]]:
+        """
+        Store a new upload as a hard link to an existing file with identical content
+        
+        Returns:
+            Same tuple as save_file, or None if linking isn't possible
+        """
+        existing_path = self.get_file_path(existing_relative_path)
+        unique_filename = self.generate_unique_filename(original_filename, user_id)
+        full_path = self.get_user_directory(user_id) / unique_filename
+        
+        try:
+            os.link(existing_path, full_path)
+        except OSError:
+            return None
+        
+        relative_path = str(full_path.relative_to(self.base_dir))
+        return relative_path, unique_filename, full_path.stat().st_size
+    
     def get_file_path(self, relative_path: str) -> Path:
         """Get full path from relative path"""
         return self.base_dir / relative_path
@@ -176,6 +268,31 @@ class FileStorage:
         with open(full_path, 'rb') as f:
             return f.read()
     
+    def open_file(self, relative_path: str) -> Optional[Tuple[BinaryIO, int]]:
+        """Open file for streaming; returns (binary file object, size) or None"""
+        full_path = self.get_file_path(relative_path)
+        
+        try:
+            f = open(full_path, 'rb')
+        except FileNotFoundError:
+            return None
+        
+        return f, os.fstat(f.fileno()).st_size
+    
+    def iter_file(self, relative_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield file contents in fixed-size blocks"""
+        opened = self.open_file(relative_path)
+        if opened is None:
+            return
+        
+        f, _ = opened
+        with f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
     def delete_file(self, relative_path: str) -> bool:
         """Delete file from disk"""
         full_path = self.get_file_path(relative_path)
@@ -189,7 +306,9 @@ class FileStorage:
             # Try to remove empty parent directories
             try:
                 full_path.parent.rmdir()
+                self._known_dirs.discard(full_path.parent)
                 full_path.parent.parent.rmdir()
+                self._known_dirs.discard(full_path.parent.parent)
             except OSError:
                 pass  # Directory not empty
             
@@ -245,6 +364,7 @@ class FileStorage:
                 dir_path = Path(root) / dir_name
                 try:
                     dir_path.rmdir()  # Only removes if empty
+                    self._known_dirs.discard(dir_path)
                 except OSError:
                     pass  # Directory not empty
 
@@ -679,13 +679,12 @@ def render_chat(settings: dict):
             final_prompt = "".join(file_context_parts)
             
             # Attach files to conversation in database
-            for file in st.session_state.attached_files:
-                file_manager.attach_to_conversation(
-                    file['id'], 
-                    st.session_state.current_conversation_id,
-                    user_id,
-                    context_type='reference'
-                )
+            file_manager.bulk_attach_to_conversation(
+                [file['id'] for file in st.session_state.attached_files],
+                st.session_state.current_conversation_id,
+                user_id,
+                context_type='reference'
+            )
         
         # Add user message to display (show original prompt + file + image indicators)
         display_content = prompt
@@ -90,7 +90,7 @@ def _render_summary_tab(conversation_id: int, user_id: int, messages: list):
     with col2:
         if st.button("🔄 Regenerate Summary", use_container_width=True):
             with st.spinner("Generating summary..."):
-                summary = summarize_conversation(conversation_id, user_id, use_ai=False)
+                summary = summarize_conversation(conversation_id, user_id, use_ai=False, force=True)
                 st.success("✅ Summary generated!")
                 st.rerun()
     
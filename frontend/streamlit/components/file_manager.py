@@ -103,12 +103,11 @@ class FileManagerUI:
                 status_text.text(f"Uploading {uploaded_file.name}...")
                 
                 try:
-                    file_data = uploaded_file.read()
-                    
-                    result = file_manager.upload_file(
-                        file_data=file_data,
+                    result = file_manager.upload_stream(
+                        file_obj=uploaded_file,
                         original_filename=uploaded_file.name,
                         user_id=user_id,
+                        size=uploaded_file.size,
                         description=description,
                         folder_path=folder_path,
                         enable_text_extraction=enable_text_extraction,
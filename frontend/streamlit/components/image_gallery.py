@@ -90,7 +90,9 @@ class ImageGalleryUI:
         st.divider()
         
         # Get images
-        images = image_handler.list_user_images(user_id, source=source, limit=limit)
+        images = image_handler.list_user_images(
+            user_id, source=source, limit=limit, include_dimensions=True
+        )
         
         if not images:
             render_empty_state(
@@ -5,6 +5,7 @@ import streamlit as st
 from backend.core.model_factory import model_factory
 from backend.database.operations import ConversationDB, MessageDB, get_db
 from backend.core.agent_manager import get_agent_manager
+from backend.core.conversation_summarizer import forget_conversation_summary
 from frontend.streamlit.components.ui_utils import (
     render_conversation_card,
     render_empty_state,
@@ -380,6 +381,7 @@ def render_sidebar() -> dict:
                         with col1:
                             if st.button("Yes, delete", key=f"confirm_yes_{conv.id}", use_container_width=True):
                                 ConversationDB.delete_conversation(conv.id)
+                                forget_conversation_summary(conv.id)
                                 st.session_state[f"confirm_delete_{conv.id}"] = False
                                 show_toast("Conversation deleted", "success")
                                 st.rerun()
@@ -0,0 +1,84 @@
+"""
+Conversation file listing with RAG prewarming over mixed attachments
+"""
+import io
+
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import backend.database.operations as operations
+from backend.database.models import Base
+from backend.database.file_operations import FileDB
+from backend.core.file_manager import file_manager
+from backend.core.file_rag import FileRAG
+
+
+@pytest.fixture
+def isolated_storage(tmp_path, monkeypatch):
+    """Point the database at in-memory SQLite and uploads at a temp dir"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(
+        operations, "SessionLocal",
+        sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    )
+    monkeypatch.setattr(file_manager.storage, "base_dir", tmp_path)
+    monkeypatch.setattr(file_manager.storage, "_known_dirs", set())
+    return tmp_path
+
+
+def _png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), (10, 20, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_prewarm_with_image_and_text_attachments(isolated_storage):
+    user_id, conversation_id = 1, 5
+
+    text_upload = file_manager.upload_file(
+        b"Quarterly numbers went up.", "notes.txt", user_id,
+        enable_text_extraction=False
+    )
+    image_upload = file_manager.upload_file(
+        _png_bytes(), "chart.png", user_id,
+        enable_text_extraction=False, enable_thumbnail=False
+    )
+    assert text_upload['success'] and image_upload['success']
+    text_id = text_upload['file']['id']
+    image_id = image_upload['file']['id']
+
+    for file_id in (text_id, image_id):
+        assert file_manager.attach_to_conversation(file_id, conversation_id, user_id)
+
+    files = file_manager.get_conversation_files(conversation_id, user_id, prewarm=True)
+
+    assert {f['id'] for f in files} == {text_id, image_id}
+    assert FileDB.get_file(text_id).extracted_text == "Quarterly numbers went up."
+    assert FileDB.get_file(image_id).extracted_text is None
+
+
+def test_warm_contexts_tolerates_image_files(isolated_storage):
+    user_id = 1
+
+    text_upload = file_manager.upload_file(
+        b"Plain text body.", "body.txt", user_id, enable_text_extraction=False
+    )
+    image_upload = file_manager.upload_file(
+        _png_bytes(), "photo.png", user_id,
+        enable_text_extraction=False, enable_thumbnail=False
+    )
+    text_id = text_upload['file']['id']
+    image_id = image_upload['file']['id']
+
+    contexts = FileRAG.warm_contexts([text_id, image_id], user_id)
+
+    assert contexts[text_id] == "Plain text body."
+    assert contexts[image_id] is None
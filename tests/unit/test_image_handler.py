@@ -0,0 +1,54 @@
+"""
+Image handler thumbnail caching
+"""
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from backend.core.image_handler import ImageHandler
+
+
+@pytest.fixture
+def handler(tmp_path, monkeypatch):
+    """Image handler whose storage directories live under a temp dir"""
+    monkeypatch.setattr(ImageHandler, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(ImageHandler, "GENERATED_DIR", tmp_path / "generated")
+    monkeypatch.setattr(ImageHandler, "SEARCH_CACHE_DIR", tmp_path / "search")
+    monkeypatch.setattr(ImageHandler, "BLOB_DIR", tmp_path / "blobs")
+    return ImageHandler()
+
+
+def _png_bytes(size) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 100, 50)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _thumbnail_size(path: str):
+    with Image.open(path) as img:
+        return img.size
+
+
+def test_create_thumbnail_honours_size_after_upload(handler):
+    result = handler.save_uploaded_image(_png_bytes((1000, 800)), "photo.png", 1)
+    assert result['success']
+    image_path = result['file_path']
+
+    assert _thumbnail_size(result['thumbnail_path']) == (200, 160)
+    assert _thumbnail_size(handler.create_thumbnail(image_path, size=(64, 64))) == (64, 51)
+    assert _thumbnail_size(handler.create_thumbnail(image_path, size=(600, 600))) == (600, 480)
+    assert _thumbnail_size(handler.create_thumbnail(image_path)) == (200, 160)
+
+
+def test_sized_thumbnails_are_hidden_and_deleted_with_image(handler):
+    result = handler.save_uploaded_image(_png_bytes((300, 300)), "square.png", 1)
+    image_path = result['file_path']
+    handler.create_thumbnail(image_path, size=(64, 64))
+
+    listed = handler.list_user_images(1)
+    assert [image['filename'] for image in listed] == [result['filename']]
+
+    assert handler.delete_image(image_path)
+    assert list(Path(image_path).parent.iterdir()) == []